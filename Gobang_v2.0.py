@@ -13,41 +13,56 @@ Updates: 1. 增加GUI界面，用户选择落子位置方式改为鼠标点击
          2. 保持原有AI智能程度，难度适中，测试中暂未出现无厘头的落子情况。
 """
 
-import tkinter as tk
-import tkinter.messagebox
-import numpy as np
+import time
+
+STARTUP_BEGIN = time.perf_counter()
+
+import argparse
+import struct
+import gobang_engine
+from gobang_engine import EMPTY, PLAYER_COLOR, AI_COLOR, SUPPORTED_BOARD_SIZES, set_board_size, is_game_over, \
+    search_move, start_pondering, stop_pondering, start_analysis, stop_analysis, analysis_done
+from gobang_record import GameRecord, RecordWriter, RESULT_BLACK, RESULT_WHITE, iter_records, from_sgf, \
+    validate_moves
+
+ENGINE_IMPORT_TIME = time.perf_counter() - STARTUP_BEGIN
+
+# 命令行参数：可选择棋盘大小（15为标准棋盘，19、20用于Gomocup freestyle）
+parser = argparse.ArgumentParser(description="智能五子棋")
+parser.add_argument("--size", type=int, default=15, choices=SUPPORTED_BOARD_SIZES, help="棋盘大小")
+parser.add_argument("--record", metavar="PATH", help="对局结束后把棋谱追加到该二进制棋谱文件")
+parser.add_argument("--load", metavar="PATH", help="启动时载入局面：SGF文件，或二进制棋谱文件中的最后一局")
+parser.add_argument("--check-state", action="store_true",
+                    help="每次落子、悔棋、重做、载入后检查引擎局面与从头重建的一致，不一致时打印")
+parser.add_argument("--level", choices=list(gobang_engine.DIFFICULTY_LEVELS),
+                    help="难度等级：AI每步按该等级的节点预算搜索（不指定时按固定深度搜索）")
+parser.add_argument("--proven-file", metavar="PATH", nargs="?", const="",
+                    help="读取并追加保存已证明局面（省略 PATH 时为引擎模块旁的 proven_<棋盘大小>.bin）")
+parser.add_argument("--bench-render", action="store_true", help="测量整盘落满棋子时的刷新耗时后退出")
+parser.add_argument("--profile-moves", metavar="DIR", help="用 cProfile 剖析每一步AI落子，结果与局面写入该目录")
+parser.add_argument("--profile-startup", action="store_true", help="报告启动各阶段（解释器启动、导入、建表、创建窗口）的耗时")
+args = None
 
 # 棋盘大小
 BOARD_SIZE = 15
 
-# 定义棋盘状态
-EMPTY = 0
-BLACK = 1
-WHITE = 2
-
-# 定义评估函数中的权重
-# 根据五子棋中连珠情况，给出权重
-WEIGHTS = {
-    "open_two": 10,       # 活二
-    "half_three": 100,    # 死三
-    "open_three": 1000,   # 活三
-    "half_four": 10000,   # 死四
-    "open_four": 100000,  # 活四
-    "five": 1000000       # 五连
-}
+# 棋盘（嵌套列表），在 main 中按棋盘大小创建
+board = []
 
-# 定义搜索深度
-MAX_DEPTH = 3
+# 落子顺序记录，用于保存棋谱
+moves = []
 
-# 定义搜索方向，包括水平、垂直和对角线
-DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+# 悔棋撤销的落子（按原顺序），重做时依次恢复，玩家落下新子后清空
+future = []
 
-# 初始化棋盘
-board = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
+# 引擎局面：与 board 同步，落子、悔棋、重做、载入都只增量地落子/悔棋（哈希等随之更新），不从头重建
+position = None
 
-# 用户执黑，AI执白
-PLAYER_COLOR = BLACK
-AI_COLOR = WHITE
+# tkinter 只在启动GUI时（main）导入，窗口、画布与视图也在其中创建
+tk = None
+window = None
+canvas = None
+view = None
 
 # 定义棋局状态
 PLAYER_ROUND = 1
@@ -62,166 +77,435 @@ PADDING = 20
 # 定义棋盘格子的大小
 GRID_SIZE = 30
 
-# 创建窗口
-window = tk.Tk()
-window.title('五子棋')
-
-# 创建棋盘
-canvas = tk.Canvas(window, width=PADDING*2+GRID_SIZE*(BOARD_SIZE-1), height=PADDING*2+GRID_SIZE*(BOARD_SIZE-1),
-                   bg="#CDBA96")
-canvas.pack()
-
-# 绘制棋盘格线
-for board_i in range(BOARD_SIZE):
-    canvas.create_line(PADDING, PADDING + board_i * GRID_SIZE, PADDING + (BOARD_SIZE - 1) * GRID_SIZE,
-                       PADDING + board_i * GRID_SIZE)
-    canvas.create_line(PADDING + board_i * GRID_SIZE, PADDING, PADDING + board_i * GRID_SIZE,
-                       PADDING + (BOARD_SIZE - 1) * GRID_SIZE)
-
-
-def get_valid_moves(game_board):
-    """
-    获取当前棋局的合法移动位置
-    """
-    moves = set()
-    for i in range(BOARD_SIZE):
-        for j in range(BOARD_SIZE):
-            if game_board[i][j] != EMPTY:
-                # 检查此棋子周围的位置
-                for di in [-1, 0, 1]:
-                    for dj in [-1, 0, 1]:
-                        ni, nj = i + di, j + dj
-                        if 0 <= ni < BOARD_SIZE and 0 <= nj < BOARD_SIZE and game_board[ni][nj] == EMPTY:
-                            moves.add((ni, nj))
-    return list(moves)
-
-
-def evaluate_position(game_board, color):
-    """
-    评估当前棋局的得分
-    """
-    score = 0
-    for i in range(BOARD_SIZE):
-        for j in range(BOARD_SIZE):
-            if game_board[i][j] == color:
-                for dx, dy in DIRECTIONS:
-                    if 0 <= i + 4 * dx < BOARD_SIZE and 0 <= j + 4 * dy < BOARD_SIZE:
-                        line = [game_board[i + k * dx][j + k * dy] for k in range(5)]
-                        stone_count = sum(1 for p in line if p == color)
-                        if stone_count == 5:
-                            score += WEIGHTS["five"]
-                        elif stone_count == 4 and EMPTY in line:
-                            score += WEIGHTS["open_four"]
-                        elif stone_count == 3 and line.count(EMPTY) == 2:
-                            score += WEIGHTS["open_three"]
-                        elif stone_count == 2 and line.count(EMPTY) == 3:
-                            score += WEIGHTS["open_two"]
-    return score
-
-
-def is_game_over(game_board):
-    """
-    检查游戏是否结束，即是否有一方获胜
-    返回获胜方的颜色，如果没有人获胜则返回 None
-    """
-    for i in range(BOARD_SIZE):
-        for j in range(BOARD_SIZE):
-            if game_board[i][j] != EMPTY:
-                for direction in DIRECTIONS:
-                    dx, dy = direction
-                    x, y = i, j
-                    count = 0
-                    while 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
-                        if game_board[x][y] == game_board[i][j]:
-                            count += 1
-                            if count == 5:
-                                return game_board[i][j]
-                        else:
-                            count = 0
-                        x += dx
-                        y += dy
-    return None
-
-
-def alpha_beta_search(game_board, depth, alpha, beta, maximizing_player):
-    """
-    使用Alpha-Beta剪枝进行博弈树搜索
-    """
-    if depth == 0 or is_game_over(game_board):
-        return evaluate_position(game_board, AI_COLOR) - evaluate_position(game_board, PLAYER_COLOR)
-
-    valid_moves = get_valid_moves(game_board)
-    if maximizing_player:
-        max_eval = float('-inf')
-        for move in valid_moves:
-            i, j = move
-            game_board[i][j] = AI_COLOR
-            evaluation = alpha_beta_search(game_board, depth - 1, alpha, beta, False)
-            game_board[i][j] = EMPTY
-            max_eval = max(max_eval, evaluation)
-            alpha = max(alpha, evaluation)
-            if beta <= alpha:
-                break
-        return max_eval
+# 棋子颜色与最近一步标记的颜色、半径
+STONE_FILLS = {PLAYER_COLOR: "black", AI_COLOR: "white"}
+MARKER_COLOR = "red"
+MARKER_RADIUS = 4
+
+# 对局结果的提示文字（按获胜方颜色）
+RESULT_MESSAGES = {PLAYER_COLOR: "你赢了！", AI_COLOR: "AI赢了！"}
+
+# 提示（H 键）：后台分析给出的候选位置按名次标出，界面每隔 HINT_POLL_MS 毫秒检查分析是否完成
+HINT_COLOR = "blue"
+HINT_POLL_MS = 50
+
+
+class BoardView:
+    """
+    棋盘视图：启动时为每个格点预先创建一个隐藏的棋子和一个最近一步标记，之后落子、悔棋、新局只修改
+    这些画布元素的状态与颜色，不再创建或删除元素；多次修改合并到下一次空闲时（after_idle）统一刷新
+    """
+
+    def __init__(self, canvas, size):
+        self.canvas = canvas
+        self.size = size
+        for k in range(size):
+            canvas.create_line(PADDING, PADDING + k * GRID_SIZE, PADDING + (size - 1) * GRID_SIZE,
+                               PADDING + k * GRID_SIZE, tags=("grid",))
+            canvas.create_line(PADDING + k * GRID_SIZE, PADDING, PADDING + k * GRID_SIZE,
+                               PADDING + (size - 1) * GRID_SIZE, tags=("grid",))
+        self.items = [[canvas.create_oval(PADDING + j * GRID_SIZE - RADIUS, PADDING + i * GRID_SIZE - RADIUS,
+                                          PADDING + j * GRID_SIZE + RADIUS, PADDING + i * GRID_SIZE + RADIUS,
+                                          state="hidden", tags=("stone", "cell_%d_%d" % (i, j)))
+                       for j in range(size)] for i in range(size)]
+        self.marker = canvas.create_oval(0, 0, 0, 0, fill=MARKER_COLOR, outline="", state="hidden",
+                                         tags=("marker",))
+        self.hint_items = [canvas.create_text(0, 0, text=str(n + 1), fill=HINT_COLOR, state="hidden",
+                                              font=("Arial", 14, "bold"), tags=("hint",))
+                           for n in range(gobang_engine.ANALYSIS_COUNT)]
+        self.hints = []
+        self.hints_dirty = False
+        self.shown = {}          # 当前显示的棋子 (i, j) -> 颜色
+        self.pending = {}        # 等待刷新的修改 (i, j) -> 颜色（EMPTY 表示隐藏）
+        self.last_move = None
+        self.marker_dirty = False
+        self.scheduled = False
+        self.frame_times = []    # 每次刷新的耗时（秒）
+
+    def set_stone(self, i, j, color):
+        self.pending[(i, j)] = color
+        self._schedule()
+
+    def set_last_move(self, move):
+        self.last_move = move
+        self.marker_dirty = True
+        self._schedule()
+
+    def set_hints(self, hints):
+        """
+        标出提示的候选位置（按名次），传入空列表时隐藏
+        """
+        if hints or self.hints:
+            self.hints = hints[:len(self.hint_items)]
+            self.hints_dirty = True
+            self._schedule()
+
+    def clear(self):
+        """
+        新局：隐藏所有已显示的棋子、标记与提示
+        """
+        for cell in self.shown:
+            self.pending[cell] = EMPTY
+        self.set_last_move(None)
+        self.set_hints([])
+
+    def _schedule(self):
+        if not self.scheduled:
+            self.scheduled = True
+            self.canvas.after_idle(self.flush)
+
+    def flush(self):
+        """
+        把合并后的修改一次性应用到画布上，并记录本次刷新耗时
+        """
+        start = time.perf_counter()
+        self.scheduled = False
+        canvas = self.canvas
+        for (i, j), color in self.pending.items():
+            if self.shown.get((i, j), EMPTY) == color:
+                continue
+            if color == EMPTY:
+                canvas.itemconfigure(self.items[i][j], state="hidden")
+                del self.shown[(i, j)]
+            else:
+                canvas.itemconfigure(self.items[i][j], state="normal", fill=STONE_FILLS[color])
+                self.shown[(i, j)] = color
+        self.pending.clear()
+        if self.marker_dirty:
+            self.marker_dirty = False
+            if self.last_move is None:
+                canvas.itemconfigure(self.marker, state="hidden")
+            else:
+                i, j = self.last_move
+                x, y = PADDING + j * GRID_SIZE, PADDING + i * GRID_SIZE
+                canvas.coords(self.marker, x - MARKER_RADIUS, y - MARKER_RADIUS, x + MARKER_RADIUS, y + MARKER_RADIUS)
+                canvas.itemconfigure(self.marker, state="normal")
+                canvas.tag_raise(self.marker)
+        if self.hints_dirty:
+            self.hints_dirty = False
+            for n, item in enumerate(self.hint_items):
+                if n < len(self.hints):
+                    i, j = self.hints[n]
+                    canvas.coords(item, PADDING + j * GRID_SIZE, PADDING + i * GRID_SIZE)
+                    canvas.itemconfigure(item, state="normal")
+                    canvas.tag_raise(item)
+                else:
+                    canvas.itemconfigure(item, state="hidden")
+        self.frame_times.append(time.perf_counter() - start)
+
+
+def place_stone(i, j, color):
+    """
+    在棋盘数组、落子记录与视图中落子，并标记为最近一步
+    """
+    board[i][j] = color
+    moves.append((i, j))
+    position.play(gobang_engine.to_index(i, j), color)
+    view.set_stone(i, j, color)
+    view.set_last_move((i, j))
+    view.set_hints([])
+    check_state()
+
+
+def move_color(n):
+    """
+    第 n 步（从0开始）的颜色：玩家执黑先行
+    """
+    return PLAYER_COLOR if n % 2 == 0 else AI_COLOR
+
+
+def check_state():
+    """
+    --check-state 时比较引擎局面与按落子记录从头重建的局面
+    """
+    if args.check_state:
+        errors = position.check_consistency([(gobang_engine.to_index(i, j), move_color(n))
+                                             for n, (i, j) in enumerate(moves)])
+        if errors:
+            print("局面不一致（第 %d 步）: %s" % (len(moves), ", ".join(errors)))
+
+
+def set_moves(target):
+    """
+    把对局变为落子序列 target：只撤销与当前记录不同的部分再依次落下其余棋子，
+    棋盘数组、视图与引擎局面都增量更新，置换表等缓存保持有效
+    """
+    target_moves = [(gobang_engine.to_index(i, j), move_color(n)) for n, (i, j) in enumerate(target)]
+    stop_pondering()
+    stop_analysis()
+    window.title("五子棋")
+    common = 0
+    while common < min(len(moves), len(target)) and moves[common] == target[common]:
+        common += 1
+    for i, j in moves[common:]:
+        board[i][j] = EMPTY
+        view.set_stone(i, j, EMPTY)
+    del moves[common:]
+    for n, (i, j) in enumerate(target[common:], common):
+        board[i][j] = move_color(n)
+        moves.append((i, j))
+        view.set_stone(i, j, move_color(n))
+    position.goto(target_moves)
+    view.set_last_move(moves[-1] if moves else None)
+    view.set_hints([])
+    check_state()
+
+
+def continue_game():
+    """
+    悔棋、重做或载入后：局面已分出胜负时显示结果（之后的点击被忽略），
+    否则轮到AI时让AI落子，轮到玩家时在其思考期间后台思考
+    """
+    if not moves:
+        return
+    winner = is_game_over(position)
+    if winner is not None:
+        tk.messagebox.showinfo("对局已结束", RESULT_MESSAGES[winner] + "\n按 U 悔棋或 N 开始新局")
+        return
+    if len(moves) % 2 == 1:
+        make_ai_move()
     else:
-        min_eval = float('inf')
-        for move in valid_moves:
-            i, j = move
-            game_board[i][j] = PLAYER_COLOR
-            evaluation = alpha_beta_search(game_board, depth - 1, alpha, beta, True)
-            game_board[i][j] = EMPTY
-            min_eval = min(min_eval, evaluation)
-            beta = min(beta, evaluation)
-            if beta <= alpha:
-                break
-        return min_eval
+        start_pondering(board)
 
 
-def make_ai_move():
+def make_ai_move(player_move=None):
     """
-    AI进行移动，使用Alpha-Beta剪枝搜索选择最佳位置
+    AI进行移动，使用Alpha-Beta剪枝搜索选择最佳位置；若后台思考命中则直接采用其结果
     """
     window.update_idletasks()
-    best_score = float('-inf')
-    best_move = None
-    for move in get_valid_moves(board):
-        i, j = move
-        board[i][j] = AI_COLOR
-        score = alpha_beta_search(board, MAX_DEPTH, float('-inf'), float('inf'), False)
-        board[i][j] = EMPTY
-        if score > best_score:
-            best_score = score
-            best_move = move
+    pondered = stop_pondering(player_move)
+    if pondered is not None:
+        best_move, _ = pondered
+    else:
+        best_move, _ = search_move(position)
     if best_move:
-        i, j = best_move
-        board[i][j] = AI_COLOR
-        canvas.create_oval(PADDING+j*GRID_SIZE-RADIUS, PADDING+i*GRID_SIZE-RADIUS,
-                           PADDING+j*GRID_SIZE+RADIUS, PADDING+i*GRID_SIZE+RADIUS, fill="white")
-    window.update()
+        place_stone(best_move[0], best_move[1], AI_COLOR)
+    start_pondering(board)
+
+
+def save_record(result):
+    """
+    保存棋谱（仅在指定 --record 时）
+    """
+    if args.record:
+        with RecordWriter(args.record) as writer:
+            writer.write(GameRecord(list(moves), BOARD_SIZE, result, "玩家", "AI"))
+
+
+def new_game(event=None):
+    """
+    开始新局：清空棋盘数组、落子记录与重做记录，视图只隐藏已有棋子
+    """
+    del future[:]
+    set_moves([])
+
+
+def undo_move(event=None):
+    """
+    悔棋：撤销到玩家上一次落子之前（通常为AI与玩家各一步），撤销的落子可以重做
+    """
+    keep = max(len(moves) - (2 if len(moves) % 2 == 0 else 1), 0)
+    future[:0] = moves[keep:]
+    set_moves(moves[:keep])
+    continue_game()
+
+
+def redo_move(event=None):
+    """
+    重做：恢复悔棋撤销的玩家与AI各一步
+    """
+    if future:
+        restored = future[:2]
+        del future[:2]
+        set_moves(moves + restored)
+        continue_game()
+
+
+def read_position(path):
+    """
+    读取局面文件：.sgf 为SGF文本，其余按二进制棋谱读取最后一局；棋盘大小须与当前一致，
+    落子须在棋盘内且不重复。文件有误时抛出 ValueError，此时界面与局面都未改动
+    """
+    if path.lower().endswith(".sgf"):
+        with open(path, encoding="utf-8") as f:
+            record = from_sgf(f.read())
+    else:
+        record = None
+        for record in iter_records(path):
+            pass
+        if record is None:
+            raise ValueError("%s 中没有棋谱" % path)
+    if record.size != BOARD_SIZE:
+        raise ValueError("棋谱为 %dx%d，当前棋盘为 %dx%d" % (record.size, record.size, BOARD_SIZE, BOARD_SIZE))
+    validate_moves(record.moves, BOARD_SIZE)
+    return record
+
+
+def load_position(event=None):
+    """
+    载入局面（L 键）：从当前局面增量地跳转到所选棋谱的局面，轮到AI时由AI继续
+    """
+    import tkinter.filedialog
+    path = tkinter.filedialog.askopenfilename(title="载入局面")
+    if not path:
+        return
+    try:
+        record = read_position(path)
+    except (OSError, ValueError, struct.error) as exc:
+        tk.messagebox.showerror("载入失败", str(exc))
+        return
+    del future[:]
+    set_moves(list(record.moves))
+    continue_game()
+
+
+def show_hint(event=None):
+    """
+    提示：在后台对玩家的当前局面做多PV搜索，界面保持响应，完成后标出最好的几个位置
+    """
+    if is_game_over(position) is not None:
+        return
+    start_analysis(board, PLAYER_COLOR)
+    window.title("五子棋 - 分析中…")
+    window.after(HINT_POLL_MS, poll_hint)
+
+
+def poll_hint():
+    """
+    轮询后台分析；完成后标出候选位置，并在标题栏显示各候选的评分（玩家视角），
+    然后重新启动分析前被结束的后台思考。分析被落子等操作中止时结果为 None，不做任何事
+    """
+    if not analysis_done():
+        window.after(HINT_POLL_MS, poll_hint)
+        return
+    result = stop_analysis(wait=True)
+    if result is None:
+        return
+    window.title("五子棋")
+    if moves:
+        start_pondering(board)
+    if result:
+        view.set_hints([move for move, _, _ in result])
+        window.title("五子棋 - 提示: " + "  ".join("%d. %s %+d" % (n + 1, move, score)
+                                                 for n, (move, score, _) in enumerate(result)))
+
+
+def game_over(message):
+    """
+    显示结果并询问是否再来一局，否则退出
+    """
+    window.update_idletasks()
+    if tk.messagebox.askyesno("游戏结束", message + "\n再来一局？"):
+        new_game()
+    else:
+        window.quit()
 
 
 def click(event):
     """
-    鼠标点击事件
+    鼠标点击事件；已分出胜负的局面（如载入或重做到终局）不再接受落子
     """
-    global board
     i, j = round((event.y - PADDING) / GRID_SIZE), round((event.x - PADDING) / GRID_SIZE)
-    if 0 <= i < BOARD_SIZE and 0 <= j < BOARD_SIZE and board[i][j] == EMPTY:
-        board[i][j] = PLAYER_COLOR
-        canvas.create_oval(PADDING+j*GRID_SIZE-RADIUS, PADDING+i*GRID_SIZE-RADIUS, PADDING+j*GRID_SIZE+RADIUS,
-                           PADDING+i*GRID_SIZE+RADIUS, fill="black")
-        if is_game_over(board):
-            tk.messagebox.showinfo("游戏结束", "你赢了！")  # 根据游戏结果用户获胜显示对应信息
-            window.quit()
+    if 0 <= i < BOARD_SIZE and 0 <= j < BOARD_SIZE and board[i][j] == EMPTY and is_game_over(position) is None:
+        stop_analysis()
+        window.title("五子棋")
+        del future[:]
+        place_stone(i, j, PLAYER_COLOR)
+        if is_game_over(position) == PLAYER_COLOR:
+            stop_pondering()
+            save_record(RESULT_BLACK)
+            game_over(RESULT_MESSAGES[PLAYER_COLOR])  # 根据游戏结果用户获胜显示对应信息
         else:
-            make_ai_move()
-            if is_game_over(board):
-                tk.messagebox.showinfo("游戏结束", "AI赢了！")  # 根据游戏结果AI获胜显示对应信息
-                window.quit()
+            make_ai_move((i, j))
+            if is_game_over(position) == AI_COLOR:
+                save_record(RESULT_WHITE)
+                game_over(RESULT_MESSAGES[AI_COLOR])  # 根据游戏结果AI获胜显示对应信息
+
+
+def benchmark_render(rounds=20):
+    """
+    在整盘落满棋子与清空之间反复切换，返回单次刷新的平均与最大耗时（秒）
+    """
+    for _ in range(rounds):
+        for i in range(BOARD_SIZE):
+            for j in range(BOARD_SIZE):
+                view.set_stone(i, j, PLAYER_COLOR if (i + j) % 2 == 0 else AI_COLOR)
+        view.set_last_move((BOARD_SIZE // 2, BOARD_SIZE // 2))
+        window.update_idletasks()
+        view.clear()
+        window.update_idletasks()
+    frames = view.frame_times
+    return sum(frames) / len(frames), max(frames)
 
 
-# 绑定鼠标点击事件
-canvas.bind("<Button-1>", click)
+def main():
+    """
+    解析命令行参数，设置棋盘大小，导入 tkinter 并创建窗口
+    """
+    global args, BOARD_SIZE, board, position, tk, window, canvas, view, make_ai_move
+    args = parser.parse_args()
+    BOARD_SIZE = args.size
+    timings = [("导入引擎与棋谱模块", ENGINE_IMPORT_TIME)]
+
+    start = time.perf_counter()
+    set_board_size(BOARD_SIZE)
+    if args.proven_file is not None:
+        gobang_engine.enable_proven_file(args.proven_file)
+    gobang_engine.ensure_tables()
+    gobang_engine.DIFFICULTY = args.level
+    board = [[EMPTY] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+    position = gobang_engine.Position()
+    del moves[:], future[:]
+    timings.append(("构建引擎表", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    import tkinter
+    import tkinter.messagebox
+    tk = tkinter
+    timings.append(("导入 tkinter", time.perf_counter() - start))
+
+    # 创建窗口与棋盘
+    start = time.perf_counter()
+    window = tk.Tk()
+    window.title('五子棋')
+    canvas = tk.Canvas(window, width=PADDING*2+GRID_SIZE*(BOARD_SIZE-1),
+                       height=PADDING*2+GRID_SIZE*(BOARD_SIZE-1), bg="#CDBA96")
+    canvas.pack()
+    view = BoardView(canvas, BOARD_SIZE)
+
+    # 绑定鼠标点击事件；N 键开始新局，U 键悔棋，R 键重做，L 键载入局面，H 键提示
+    canvas.bind("<Button-1>", click)
+    window.bind("<Key-n>", new_game)
+    window.bind("<Key-u>", undo_move)
+    window.bind("<Key-r>", redo_move)
+    window.bind("<Key-l>", load_position)
+    window.bind("<Key-h>", show_hint)
+    timings.append(("创建窗口与棋盘", time.perf_counter() - start))
+
+    if args.profile_moves:
+        from gobang_profile import MoveProfiler
+        make_ai_move = MoveProfiler(args.profile_moves).wrap(make_ai_move, lambda: (list(moves), BOARD_SIZE))
+
+    if args.load:
+        set_moves(list(read_position(args.load).moves))
+        continue_game()
+
+    if args.profile_startup:
+        # 合计从进程创建起计时，包括脚本开始执行之前的解释器启动与标准库导入
+        from gobang_profile import process_elapsed
+        script_time = time.perf_counter() - STARTUP_BEGIN
+        total = process_elapsed()
+        if total is not None:
+            timings.insert(0, ("解释器启动", max(total - script_time, 0.0)))
+        for name, elapsed in timings:
+            print("%-12s %7.1f ms" % (name, elapsed * 1000))
+        print("%-12s %7.1f ms" % ("合计", (script_time if total is None else total) * 1000))
+    if args.bench_render:
+        average, worst = benchmark_render()
+        print("%dx%d 整盘刷新: 平均 %.2f ms，最长 %.2f ms" % (BOARD_SIZE, BOARD_SIZE, average * 1000, worst * 1000))
+    else:
+        window.mainloop()  # 进入主循环
+
 
 if __name__ == "__main__":
-    window.mainloop()  # 进入主循环
+    main()
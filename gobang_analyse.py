@@ -0,0 +1,202 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 批量复盘：用进程池分析一个目录（或单个文件）中所有棋谱的每一步，
+      以 JSON lines 流式输出每步的最佳位置、评分损失与失误标记。
+      每局依次输出各步的 {"type": "move", ...}，最后输出一行 {"type": "game", ...} 表示该局完成；
+      中断后再次运行会截掉最后一局不完整的输出，并跳过已完成的局继续分析（输入目录不变时）。
+      同时在途的对局数有上限，输出按输入顺序写出，内存占用与输入大小无关。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import time
+
+import gobang_engine as engine
+from gobang_record import MAGIC, iter_records
+from gobang_selfplay import engine_view
+
+# 评分损失达到这些值时分别标记为失误（mistake）与败着（blunder）；错过必胜或走入必败也记为败着
+MISTAKE_LOSS = engine.WEIGHTS["open_three"]
+BLUNDER_LOSS = engine.WEIGHTS["open_four"]
+
+# 每个工作进程同时在途的对局数
+JOBS_PER_WORKER = 2
+
+# 默认每个局面的节点预算：按节点数停止的搜索与机器速度、负载无关，同一棋谱在任何机器上的复盘结果都相同；
+# 只指定 --depth 时改为定深搜索
+DEFAULT_NODES = 20000
+
+COLOR_NAMES = {engine.BLACK: "black", engine.WHITE: "white"}
+
+
+def record_files(path):
+    """
+    目录中所有棋谱文件（以棋谱文件头开头），按文件名排序；path 也可以是单个文件
+    """
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isfile(full):
+            with open(full, "rb") as f:
+                if f.read(len(MAGIC)) == MAGIC:
+                    files.append(full)
+    return files
+
+
+def iter_games(path):
+    """
+    逐局产生 (序号, 文件名, 文件内局号, 棋谱)，序号在整个输入中连续编号，用于断点续跑
+    """
+    seq = 0
+    for name in record_files(path):
+        for index, record in enumerate(iter_records(name)):
+            yield seq, os.path.basename(name), index, record
+            seq += 1
+
+
+def mark(best_score, score):
+    """
+    根据最佳评分与实际评分给出标记：None / "mistake" / "blunder"
+    """
+    if best_score >= engine.WIN_THRESHOLD > score or best_score > -engine.WIN_THRESHOLD >= score:
+        return "blunder"
+    loss = best_score - score
+    if loss >= BLUNDER_LOSS:
+        return "blunder"
+    if loss >= MISTAKE_LOSS:
+        return "mistake"
+    return None
+
+
+def analyse_game(job):
+    """
+    分析一局的每一步：以行棋方视角搜索最佳位置，并算出实际落子的评分；返回 (序号, 输出行列表)
+    同一局的各步共用置换表；每局开始时清空所有缓存，结果只取决于这一局，与进程先分析过哪些局无关
+    """
+    seq, name, index, size, moves, result, depth, nodes = job
+    if engine.BOARD_SIZE != size:
+        engine.set_board_size(size)
+    engine.clear_search_state()
+    losses = {"black": 0, "white": 0}
+    marks = {"black": collections.Counter(), "white": collections.Counter()}
+    lines = []
+    for ply, move in enumerate(moves):
+        color = engine.BLACK if ply % 2 == 0 else engine.WHITE
+        pos = engine.Position()
+        for i, j, stone in engine_view(moves[:ply], color):
+            pos.play(engine.to_index(i, j), stone)
+        if pos.winner() is not None:
+            break
+        nodes_before = engine.search_stats["nodes"]
+        if nodes is None:
+            engine.MAX_DEPTH = depth
+            best, best_score = engine.search_best_move(pos)
+        else:
+            # 按节点预算迭代加深，实际落子在同一次搜索、同一深度内评分，整步的节点数不超过预算
+            best, best_score = engine.search_with_budget(pos, nodes=nodes, max_depth=depth,
+                                                         move=engine.to_index(*move))
+        if best is None:
+            continue
+        if nodes is not None:
+            score = engine.budget_stats["move_score"]
+        else:
+            score = best_score if tuple(best) == tuple(move) else engine.score_move(pos, engine.to_index(*move))
+        tag = mark(best_score, score)
+        side = COLOR_NAMES[color]
+        losses[side] += best_score - score
+        if tag is not None:
+            marks[side][tag] += 1
+        lines.append({"type": "move", "seq": seq, "file": name, "game": index, "ply": ply, "color": side,
+                      "move": list(move), "best": list(best), "best_score": best_score, "score": score,
+                      "loss": best_score - score, "mark": tag,
+                      "nodes": engine.search_stats["nodes"] - nodes_before})
+    lines.append({"type": "game", "seq": seq, "file": name, "game": index, "moves": len(moves), "result": result,
+                  "loss": losses, "mistakes": {side: counts["mistake"] for side, counts in marks.items()},
+                  "blunders": {side: counts["blunder"] for side, counts in marks.items()}})
+    return seq, lines
+
+
+def init_worker():
+    # 已证明局面会在进程内跨局累积，使结果依赖于分析顺序，复盘时不使用
+    engine.PROVEN_CACHE = False
+    engine.PROVEN_AUTOSAVE = False
+
+
+def resume_point(output):
+    """
+    返回已完成的对局数，并截掉最后一个 "game" 行之后不完整的输出；逐行扫描，不把文件读入内存
+    """
+    if not os.path.exists(output):
+        return 0
+    done = 0
+    keep = 0
+    with open(output, "rb") as f:
+        offset = 0
+        for raw in f:
+            offset += len(raw)
+            if not raw.endswith(b"\n"):
+                break
+            line = json.loads(raw)
+            if line["type"] == "game":
+                done = line["seq"] + 1
+                keep = offset
+    with open(output, "r+b") as f:
+        f.truncate(keep)
+    return done
+
+
+def run(path, output, workers, depth, nodes=None):
+    """
+    分析 path 中的所有棋谱，结果追加到 output；返回 (此前已完成的局数, 本次分析的局数, 步数)
+    """
+    done = resume_point(output)
+    games = plies = 0
+    pending = collections.deque()
+    jobs = ((seq, name, index, record.size, record.moves, record.result, depth, nodes)
+            for seq, name, index, record in iter_games(path) if seq >= done)
+    with multiprocessing.Pool(workers, initializer=init_worker) as pool, \
+            open(output, "a", encoding="utf-8") as out:
+        def write_next():
+            nonlocal games, plies
+            _, lines = pending.popleft().get()
+            for line in lines:
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            out.flush()
+            games += 1
+            plies += len(lines) - 1
+
+        for job in jobs:
+            pending.append(pool.apply_async(analyse_game, (job,)))
+            if len(pending) >= workers * JOBS_PER_WORKER:
+                write_next()
+        while pending:
+            write_next()
+    return done, games, plies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量复盘棋谱，输出每步的评分损失与失误标记（JSON lines）")
+    parser.add_argument("records", help="棋谱文件或目录")
+    parser.add_argument("-o", "--output", default="analysis.jsonl", help="输出文件，已存在时从中断处继续")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="并行进程数")
+    parser.add_argument("--depth", type=int,
+                        help="搜索深度：单独指定时定深搜索，与 --nodes 同时指定时为迭代加深的最大深度")
+    parser.add_argument("--nodes", type=int,
+                        help="每个局面的节点预算（迭代加深，结果确定），未指定 --depth 时默认 %d" % DEFAULT_NODES)
+    args = parser.parse_args()
+    if args.nodes is None and args.depth is None:
+        args.nodes = DEFAULT_NODES
+    if args.depth is None:
+        args.depth = engine.BUDGET_MAX_DEPTH
+    start = time.perf_counter()
+    skipped, analysed, positions = run(args.records, args.output, args.workers, args.depth, args.nodes)
+    if skipped:
+        print("跳过已完成的 %d 局" % skipped)
+    print("分析 %d 局，%d 步，用时 %.1f s，结果写入 %s" % (analysed, positions, time.perf_counter() - start,
+                                                   args.output))
@@ -0,0 +1,354 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 引擎的性能测试、对弈测试与一致性检查：不同棋盘大小的单节点开销、开局对称缓存命中率、
+      战术局面上各搜索设置的正确率与节点数、已证明局面缓存、两组设置对弈，以及随机落子/悔棋/跳转后的局面一致性。
+      命令行：python gobang_bench.py --bench-threats 等，战术局面与一致性检查的断言见 tests/。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import random
+import time
+
+import gobang_engine as engine
+from gobang_engine import EMPTY, BLACK, WHITE, PLAYER_COLOR, AI_COLOR, search_settings
+
+
+def benchmark_board_sizes(sizes=engine.SUPPORTED_BOARD_SIZES, depth=engine.MAX_DEPTH):
+    """
+    在不同棋盘大小上搜索同一个居中的开局，比较每个节点的平均耗时
+    增量结构（落子栈、邻域表、窗口切片）使单节点开销基本与棋盘大小无关
+    """
+    saved_size = engine.BOARD_SIZE
+    stones = [(0, 0, BLACK), (0, 1, WHITE), (1, 1, BLACK), (1, 0, WHITE), (-1, -1, BLACK), (2, 2, WHITE)]
+    results = []
+    try:
+        with search_settings(MAX_DEPTH=depth):
+            for size in sizes:
+                engine.set_board_size(size)
+                game_board = [[EMPTY] * size for _ in range(size)]
+                center = size // 2
+                for di, dj, color in stones:
+                    game_board[center + di][center + dj] = color
+                engine.search_stats["nodes"] = 0
+                start = time.perf_counter()
+                engine.search_best_move(game_board)
+                elapsed = time.perf_counter() - start
+                nodes = engine.search_stats["nodes"]
+                results.append((size, nodes, elapsed, elapsed / max(nodes, 1) * 1e6))
+    finally:
+        engine.set_board_size(saved_size)
+    return results
+
+
+def benchmark_symmetry_cache(openings=6, seed=1):
+    """
+    随机生成若干前10手内的开局，依次搜索它们的8种对称变换，统计对称缓存的命中率与节省的节点数
+    """
+    rng = random.Random(seed)
+    engine.ensure_tables()
+    engine.symmetry_cache.clear()
+    engine.transposition_table.clear()
+    for key in engine.symmetry_stats:
+        engine.symmetry_stats[key] = 0
+    engine.search_stats["nodes"] = 0
+    size = engine.BOARD_SIZE
+    center = size // 2
+    for _ in range(openings):
+        base = [[EMPTY] * size for _ in range(size)]
+        whites = rng.randrange(0, engine.SYMMETRY_CACHE_MOVES // 2)
+        for color in [BLACK] * (whites + 1) + [WHITE] * whites:
+            while True:
+                i, j = center + rng.randint(-3, 3), center + rng.randint(-3, 3)
+                if base[i][j] == EMPTY:
+                    base[i][j] = color
+                    break
+        for mapping in engine.SYMMETRY_MAPS:
+            game_board = [[EMPTY] * size for _ in range(size)]
+            for i in range(size):
+                for j in range(size):
+                    if base[i][j] != EMPTY:
+                        ti, tj = engine.to_coord(mapping[engine.to_index(i, j)])
+                        game_board[ti][tj] = base[i][j]
+            engine.search_best_move(game_board)
+    return dict(engine.symmetry_stats, nodes_searched=engine.search_stats["nodes"])
+
+
+# 战术测试局面（参考 result/ 中的截图）：(名称, 黑子, 白子, 正确应着集合)，均为AI（白）行棋
+TACTICAL_POSITIONS = [
+    ("AI堵4", [(7, 5), (7, 6), (7, 7), (7, 8), (8, 7)], [(7, 4), (6, 6), (8, 8), (9, 9)], {(7, 9)}),
+    ("AI堵活3", [(7, 6), (7, 7), (7, 8), (9, 9)], [(6, 6), (8, 9), (5, 5)], {(7, 5), (7, 9), (7, 4), (7, 10)}),
+    ("AI解双3", [(7, 7), (7, 8), (7, 9), (8, 8), (9, 8)], [(6, 6), (6, 8), (8, 6), (9, 9)], {(7, 6), (7, 10)}),
+    ("AI活三成四", [(6, 6), (8, 9), (9, 5), (5, 10)], [(7, 6), (7, 7), (7, 8)], {(7, 5), (7, 9)}),
+]
+
+
+def tactical_board(blacks, whites):
+    """
+    由黑子、白子坐标构造棋盘（嵌套列表）
+    """
+    game_board = [[EMPTY] * engine.BOARD_SIZE for _ in range(engine.BOARD_SIZE)]
+    for stones, color in ((blacks, BLACK), (whites, WHITE)):
+        for i, j in stones:
+            game_board[i][j] = color
+    return game_board
+
+
+def benchmark_tactics(configs, clear_proven=True):
+    """
+    在战术测试局面上比较不同搜索设置，configs 为 [(名称, 搜索设置字典), ...]
+    每次搜索前清空各类缓存（clear_proven 为 False 时保留已证明局面），各设置互不影响
+    返回 [(局面, 设置名称, 着法, 是否正确, 节点数, 耗时), ...]
+    """
+    engine.ensure_tables()
+    results = []
+    for name, blacks, whites, answers in TACTICAL_POSITIONS:
+        game_board = tactical_board(blacks, whites)
+        for label, settings in configs:
+            with search_settings(**settings):
+                engine.clear_search_state(clear_proven)
+                engine.search_stats["nodes"] = 0
+                start = time.perf_counter()
+                move, _ = engine.search_move(game_board)
+                results.append((name, label, move, move in answers, engine.search_stats["nodes"],
+                                time.perf_counter() - start))
+    return results
+
+
+def benchmark_proven_cache():
+    """
+    在空的已证明局面缓存上搜索战术局面两遍（第二遍前清空置换表），比较节点数；不写文件，结束后恢复原缓存
+    返回 ([(局面, 第一遍节点数, 第二遍节点数), ...], 已证明局面数, 第二遍命中次数)
+    """
+    saved, saved_pending = dict(engine.proven_positions), list(engine.proven_pending)
+    engine.proven_positions.clear()
+    try:
+        with search_settings(PROVEN_AUTOSAVE=False):
+            cold = benchmark_tactics([("", {})], clear_proven=False)
+            proven, hits_before = len(engine.proven_positions), engine.proven_stats["hits"]
+            warm = benchmark_tactics([("", {})], clear_proven=False)
+        rows = [(first[0], first[4], second[4]) for first, second in zip(cold, warm)]
+        return rows, proven, engine.proven_stats["hits"] - hits_before
+    finally:
+        engine.proven_positions.clear()
+        engine.proven_positions.update(saved)
+        engine.proven_pending[:] = saved_pending
+
+
+def benchmark_arena(settings_a, settings_b, openings=20, max_moves=100, seed=0):
+    """
+    两组搜索设置对弈：每个随机开局（3手）双方各执黑一次，返回 (A胜, B胜, 和棋, A节点数, B节点数, A耗时, B耗时)
+    引擎总以 AI_COLOR 行棋，因此执黑一方搜索前把双方棋子颜色互换；每步搜索前清空所有缓存，双方不共享搜索结果
+    """
+    engine.ensure_tables()
+    rng = random.Random(seed)
+    center = engine.BOARD_SIZE // 2
+    wins = [0, 0, 0]
+    nodes = [0, 0]
+    elapsed = [0.0, 0.0]
+    for _ in range(openings):
+        opening = []
+        while len(opening) < 3:
+            move = (center + rng.randint(-2, 2), center + rng.randint(-2, 2))
+            if move not in opening:
+                opening.append(move)
+        for black in (0, 1):
+            sides = {BLACK: black, WHITE: 1 - black}
+            moves = list(opening)
+            winner = None
+            while winner is None and len(moves) < max_moves:
+                color = BLACK if len(moves) % 2 == 0 else WHITE
+                side = sides[color]
+                pos = engine.Position()
+                for n, (i, j) in enumerate(moves):
+                    stone = BLACK if n % 2 == 0 else WHITE
+                    pos.play(engine.to_index(i, j), AI_COLOR if stone == color else PLAYER_COLOR)
+                with search_settings(**(settings_b if side else settings_a)):
+                    engine.clear_search_state()
+                    nodes_before = engine.search_stats["nodes"]
+                    start = time.perf_counter()
+                    move, _ = engine.search_best_move(pos)
+                    elapsed[side] += time.perf_counter() - start
+                    nodes[side] += engine.search_stats["nodes"] - nodes_before
+                if move is None:
+                    break
+                moves.append(move)
+                pos.play(engine.to_index(*move), AI_COLOR)
+                if pos.last_move_wins():
+                    winner = side
+            wins[2 if winner is None else winner] += 1
+    engine.clear_search_state()
+    return tuple(wins) + tuple(nodes) + tuple(elapsed)
+
+
+def check_move_stack(operations=2000, seed=0, with_accumulator=False):
+    """
+    随机落子、悔棋、重做与跳转（goto 到另一分支），每一步后与从头重建的局面比较，
+    并检查经估价缓存得到的评分与重建局面的直接估价一致；返回 (操作次数, 不一致次数)
+    with_accumulator 为 True 时同时检查随机权重网络的累加器（需要 numpy）
+    """
+    engine.ensure_tables()
+    rng = random.Random(seed)
+    center = engine.BOARD_SIZE // 2
+    pos = engine.Position()
+    if with_accumulator:
+        import gobang_nn
+        pos.accumulator = gobang_nn.NNModel.random().accumulator(pos)
+    line = []    # 当前局面的落子序列 [(下标, 颜色), ...]
+    future = []  # 悔棋撤销的落子，重做时依次恢复
+    failures = 0
+    for _ in range(operations):
+        action = rng.random()
+        if action < 0.5 or not line:
+            while True:
+                idx = engine.to_index(center + rng.randint(-6, 6), center + rng.randint(-6, 6))
+                if pos.cells[idx] == EMPTY:
+                    break
+            line.append((idx, BLACK if len(line) % 2 == 0 else WHITE))
+            future = []
+            pos.play(*line[-1])
+        elif action < 0.7:
+            for _ in range(min(rng.randint(1, 4), len(line))):
+                future.insert(0, line.pop())
+                pos.undo()
+        elif action < 0.85 and future:
+            line.append(future.pop(0))
+            pos.play(*line[-1])
+        else:
+            # 跳转到随机前缀再接上一段新的分支，同一下标可能换成另一种颜色
+            line = line[:rng.randint(0, len(line))]
+            for _ in range(rng.randint(0, 3)):
+                idx = engine.to_index(center + rng.randint(-6, 6), center + rng.randint(-6, 6))
+                if all(idx != played for played, _ in line):
+                    line.append((idx, BLACK if len(line) % 2 == 0 else WHITE))
+            future = []
+            pos.goto(line)
+        errors = pos.check_consistency(line)
+        rebuilt = engine.Position()
+        rebuilt.goto(line)
+        scores = engine.evaluate_both(rebuilt)
+        with search_settings(EVAL_CACHE=True):
+            if engine.nn_model is None and engine.static_score(pos) != scores[AI_COLOR] - scores[PLAYER_COLOR]:
+                errors.append("eval_cache")
+        failures += bool(errors)
+    return operations, failures
+
+
+def corpus(count=20, seed=0):
+    """
+    后端核对（gobang_jit verify/bench）的基准局面：战术测试局面，
+    加上 count 个在中心区域随机落子（8至24手、无五连）的中局局面，均为AI行棋
+    """
+    boards = [tactical_board(blacks, whites) for _, blacks, whites, _ in TACTICAL_POSITIONS]
+    rng = random.Random(seed)
+    center = engine.BOARD_SIZE // 2
+    while len(boards) < len(TACTICAL_POSITIONS) + count:
+        pos = engine.Position()
+        stones = 2 * rng.randint(4, 12) + 1
+        while len(pos.stack) < stones:
+            idx = engine.to_index(center + rng.randint(-4, 4), center + rng.randint(-4, 4))
+            if pos.cells[idx] == EMPTY:
+                pos.play(idx, engine.PLAYER_COLOR if len(pos.stack) % 2 == 0 else engine.AI_COLOR)
+        if pos.winner() is None:
+            boards.append([list(row) for row in pos.to_array()])
+    return boards
+
+
+def run_corpus(backend, boards):
+    """
+    用指定后端依次搜索基准局面（每个局面前清空所有缓存），返回 ([(着法, 评分), ...], 节点数, 耗时)
+    """
+    engine.set_backend(backend)
+    results = []
+    nodes_before = engine.search_stats["nodes"]
+    start = time.perf_counter()
+    with engine.search_settings(PROVEN_CACHE=False):
+        for board in boards:
+            engine.clear_search_state()
+            results.append(engine.search_best_move(board))
+    return results, engine.search_stats["nodes"] - nodes_before, time.perf_counter() - start
+
+
+# 比较后期着法缩减与空着裁剪所用的搜索设置
+REDUCTION_CONFIGS = [
+    ("d2", {"MAX_DEPTH": 2, "LMR": False, "NULL_MOVE": False}),
+    ("d2+lmr", {"MAX_DEPTH": 2, "LMR": True, "NULL_MOVE": False}),
+    ("d3", {"MAX_DEPTH": 3, "LMR": False, "NULL_MOVE": False}),
+    ("d3+lmr", {"MAX_DEPTH": 3, "LMR": True, "NULL_MOVE": False}),
+    ("d3+null", {"MAX_DEPTH": 3, "LMR": False, "NULL_MOVE": True}),
+    ("d3+lmr+null", {"MAX_DEPTH": 3, "LMR": True, "NULL_MOVE": True}),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="五子棋AI引擎：性能测试、对弈测试与一致性检查")
+    parser.add_argument("--bench-sizes", action="store_true", help="比较不同棋盘大小下的单节点搜索开销")
+    parser.add_argument("--bench-threats", action="store_true", help="比较威胁剪枝开启前后战术局面的节点数")
+    parser.add_argument("--bench-quiescence", action="store_true",
+                        help="比较深度%d无静态搜索与深度%d加静态搜索的战术正确率和节点数" % (
+                            engine.MAX_DEPTH + 1, engine.MAX_DEPTH))
+    parser.add_argument("--bench-reductions", action="store_true",
+                        help="比较后期着法缩减、空着裁剪开启前后战术局面的节点数")
+    parser.add_argument("--arena", nargs=2, metavar=("A", "B"), choices=[label for label, _ in REDUCTION_CONFIGS],
+                        help="两组搜索设置对弈，可选 %s" % "、".join(label for label, _ in REDUCTION_CONFIGS))
+    parser.add_argument("--arena-openings", type=int, default=20, help="对弈的随机开局数，每个开局双方各执黑一次")
+    parser.add_argument("--bench-proven", action="store_true", help="比较已证明局面缓存为空与已写入时战术局面的节点数")
+    parser.add_argument("--bench-eval-cache", action="store_true", help="比较估价缓存开启前后的搜索耗时与命中率")
+    parser.add_argument("--bench-symmetry", action="store_true", help="统计开局对称缓存的命中率")
+    parser.add_argument("--check-undo", action="store_true",
+                        help="随机落子、悔棋、重做与跳转，检查增量维护的局面与从头重建的一致")
+    parser.add_argument("--bench-levels", action="store_true", help="在战术局面上测试各难度等级的正确率、节点数与耗时")
+    args = parser.parse_args()
+    engine.ensure_tables()
+    failed = False
+    if args.bench_sizes:
+        for size, nodes, elapsed, per_node in benchmark_board_sizes():
+            print("%2dx%-2d  节点数 %7d  耗时 %6.2f s  单节点 %6.1f us" % (size, size, nodes, elapsed, per_node))
+    if args.bench_symmetry:
+        stats = benchmark_symmetry_cache()
+        total = stats["nodes_searched"] + stats["nodes_saved"]
+        print("对称缓存: 查询 %d 次，命中 %d 次（%.1f%%），节省节点 %d / %d（%.1f%%）" % (
+            stats["lookups"], stats["hits"], 100.0 * stats["hits"] / max(stats["lookups"], 1),
+            stats["nodes_saved"], total, 100.0 * stats["nodes_saved"] / max(total, 1)))
+    if args.bench_proven:
+        rows, proven, hits = benchmark_proven_cache()
+        for name, cold_nodes, warm_nodes in rows:
+            print("%-6s 节点数 %7d -> %7d" % (name, cold_nodes, warm_nodes))
+        print("已证明局面 %d 个，第二遍命中 %d 次" % (proven, hits))
+    tactic_configs = []
+    if args.bench_threats:
+        tactic_configs += [("威胁剪枝关", {"THREAT_PRUNING": False}), ("威胁剪枝开", {"THREAT_PRUNING": True})]
+    if args.bench_quiescence:
+        tactic_configs += [("深度%d" % (engine.MAX_DEPTH + 1), {"MAX_DEPTH": engine.MAX_DEPTH + 1, "QUIESCENCE": False}),
+                           ("深度%d+静态搜索" % engine.MAX_DEPTH, {"QUIESCENCE": True})]
+    if args.bench_eval_cache:
+        tactic_configs += [("估价缓存关", {"EVAL_CACHE": False, "PROVEN_CACHE": False}),
+                           ("估价缓存开", {"EVAL_CACHE": True, "PROVEN_CACHE": False})]
+    if args.bench_reductions:
+        tactic_configs += [(label, settings) for label, settings in REDUCTION_CONFIGS]
+    if args.check_undo:
+        for with_accumulator in (False, True):
+            operations, failures = check_move_stack(with_accumulator=with_accumulator)
+            failed |= failures > 0
+            print("悔棋/重做/跳转一致性%s: %d 次操作，不一致 %d 次" % (
+                "（含神经网络累加器）" if with_accumulator else "", operations, failures))
+    if args.bench_levels:
+        tactic_configs += [(level, {"DIFFICULTY": level}) for level in engine.DIFFICULTY_LEVELS]
+    if tactic_configs:
+        for name, label, move, correct, nodes, elapsed in benchmark_tactics(tactic_configs):
+            failed |= not correct
+            print("%-6s %-12s 应着 %-8s %s  节点数 %7d  耗时 %6.2f s" % (
+                name, label, move, "正确" if correct else "错误", nodes, elapsed))
+    if args.bench_eval_cache:
+        stats = engine.eval_cache_stats
+        print("估价缓存: 查询 %d 次，命中 %d 次（%.1f%%），淘汰 %d 次" % (
+            stats["lookups"], stats["hits"], 100.0 * stats["hits"] / max(stats["lookups"], 1), stats["evictions"]))
+    if args.arena:
+        configs = dict(REDUCTION_CONFIGS)
+        label_a, label_b = args.arena
+        a_wins, b_wins, draws, a_nodes, b_nodes, a_time, b_time = benchmark_arena(
+            configs[label_a], configs[label_b], args.arena_openings)
+        print("%s 对 %s：%d 胜 %d 负 %d 和" % (label_a, label_b, a_wins, b_wins, draws))
+        print("节点数 %d / %d，耗时 %.1f s / %.1f s" % (a_nodes, b_nodes, a_time, b_time))
+    # 战术局面应着错误或一致性检查失败时以非零状态退出，便于脚本中使用
+    raise SystemExit(1 if failed else 0)
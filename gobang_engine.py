@@ -0,0 +1,1568 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 五子棋AI引擎：棋盘表示、估价函数、胜负判断与Alpha-Beta搜索，不依赖GUI
+GitHub: RyanZzzzq
+"""
+
+import contextlib
+import json
+import os
+import random
+import struct
+import threading
+import time
+import warnings
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，已证明局面文件写入时不加锁
+    fcntl = None
+
+# 棋盘大小，默认15，可通过 set_board_size 在运行时改为19、20等（Gomocup freestyle）
+BOARD_SIZE = 15
+SUPPORTED_BOARD_SIZES = (15, 19, 20)
+
+# 带哨兵边框的棋盘宽度（四周各多一圈）
+PADDED_SIZE = BOARD_SIZE + 2
+
+# 定义棋盘状态
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3  # 哨兵，标记棋盘外的位置
+
+# 定义评估函数中的权重
+# 根据五子棋中连珠情况，给出权重
+WEIGHTS = {
+    "open_two": 10,       # 活二
+    "half_three": 100,    # 死三
+    "open_three": 1000,   # 活三
+    "half_four": 10000,   # 死四
+    "open_four": 100000,  # 活四
+    "five": 1000000       # 五连
+}
+
+# 估价函数实际使用的棋形，顺序与 pattern_counts 的返回值一致
+PATTERNS = ("five", "open_four", "open_three", "open_two")
+
+# 调参工具（gobang_tune.py）输出的权重文件，存在时在启动时覆盖上面的默认权重
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.json")
+
+# 胜负已分的局面评分：WIN_SCORE 减去从根节点到成五的步数，使搜索偏向更快取胜、更慢失败
+# 绝对值不小于 WIN_THRESHOLD 的评分表示已证明的胜负
+WIN_SCORE = 10 ** 8
+WIN_THRESHOLD = WIN_SCORE - 1000
+
+# 定义搜索深度（叶节点之后还有静态搜索）
+MAX_DEPTH = 3
+
+# 定义搜索方向，包括水平、垂直和对角线
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+# 各搜索方向在一维棋盘中的下标偏移
+DIRECTION_OFFSETS = ()
+
+# 用户执黑，AI执白
+PLAYER_COLOR = BLACK
+AI_COLOR = WHITE
+
+# Zobrist哈希表，为每个位置的每种棋子分配一个64位随机数
+ZOBRIST = []
+
+# 按一维下标索引的Zobrist表，边框位置为 None
+ZOBRIST_INDEX = []
+
+# 空着（轮到一方但不落子）时异或到哈希上的键，使空着后的局面与原局面在置换表中区分开
+ZOBRIST_NULL = random.Random(20230622).getrandbits(64)
+
+
+def to_index(i, j):
+    """
+    棋盘坐标 -> 一维下标
+    """
+    return (i + 1) * PADDED_SIZE + j + 1
+
+
+def to_coord(idx):
+    """
+    一维下标 -> 棋盘坐标
+    """
+    i, j = divmod(idx, PADDED_SIZE)
+    return i - 1, j - 1
+
+
+# 以下预计算表在模块加载时构建一次，供各热点函数复用，避免重复的边界检查与坐标运算
+# NEIGHBOURS_1: 每个位置周围一格内的棋盘内位置
+# LINES: 所有长度不小于5的线（行、列、两条对角线方向，共72条），CELL_LINES: 每个位置所属的线，LINE_SPANS: 每条线对应的切片
+# WINDOWS: 所有五格窗口，CELL_WINDOWS: 每个位置所属的窗口，WINDOW_SPANS: 每个窗口对应的切片
+# WINDOWS6 / CELL_WINDOWS6 / WINDOW6_SPANS: 同上，六格窗口，用于识别活三
+# WINDOW_SLICES: 以每个位置为起点、完全落在棋盘内的五格窗口切片（按 DIRECTIONS 顺序）
+# EMPTY_CELLS: 空棋盘（含哨兵边框）的模板，新建局面时直接复制
+# SYMMETRY_MAPS / SYMMETRY_INVERSES: 棋盘8种对称变换（旋转、翻转）下的下标映射及其逆映射
+NEIGHBOURS_1 = []
+LINES = []
+CELL_LINES = []
+LINE_SPANS = []
+WINDOWS = []
+CELL_WINDOWS = []
+WINDOW_SPANS = []
+WINDOWS6 = []
+CELL_WINDOWS6 = []
+WINDOW6_SPANS = []
+WINDOW_SLICES = []
+EMPTY_CELLS = bytearray()
+SYMMETRY_MAPS = []
+SYMMETRY_INVERSES = []
+TABLE_BUILD_TIME = 0.0
+TABLES_READY = False  # 上面的表（及 Zobrist 表）是否已按当前棋盘大小构建，见 ensure_tables
+
+
+def build_tables():
+    """
+    构建邻域、线与五格窗口的预计算表
+    """
+    global EMPTY_CELLS, TABLE_BUILD_TIME
+    start = time.perf_counter()
+    cell_count = PADDED_SIZE * PADDED_SIZE
+    on_board = [False] * cell_count
+    for i in range(BOARD_SIZE):
+        for j in range(BOARD_SIZE):
+            on_board[to_index(i, j)] = True
+
+    def neighbours(i, j, radius):
+        return tuple(to_index(i + di, j + dj)
+                     for di in range(-radius, radius + 1) for dj in range(-radius, radius + 1)
+                     if (di or dj) and 0 <= i + di < BOARD_SIZE and 0 <= j + dj < BOARD_SIZE)
+
+    neighbours_1 = [()] * cell_count
+    window_slices = [()] * cell_count
+    for i in range(BOARD_SIZE):
+        for j in range(BOARD_SIZE):
+            idx = to_index(i, j)
+            neighbours_1[idx] = neighbours(i, j, 1)
+            window_slices[idx] = tuple(slice(idx, idx + 4 * d + 1, d)
+                                       for (dx, dy), d in zip(DIRECTIONS, DIRECTION_OFFSETS)
+                                       if 0 <= i + 4 * dx < BOARD_SIZE and 0 <= j + 4 * dy < BOARD_SIZE)
+
+    # 每条线从其在棋盘内的第一个位置出发，沿方向走到边框为止
+    lines = []
+    for (dx, dy), d in zip(DIRECTIONS, DIRECTION_OFFSETS):
+        for i in range(BOARD_SIZE):
+            for j in range(BOARD_SIZE):
+                if 0 <= i - dx < BOARD_SIZE and 0 <= j - dy < BOARD_SIZE:
+                    continue
+                line = []
+                idx = to_index(i, j)
+                while on_board[idx]:
+                    line.append(idx)
+                    idx += d
+                if len(line) >= 5:
+                    lines.append(tuple(line))
+
+    cell_lines = [[] for _ in range(cell_count)]
+    cell_windows = [[] for _ in range(cell_count)]
+    cell_windows6 = [[] for _ in range(cell_count)]
+    windows = []
+    windows6 = []
+    for line_id, line in enumerate(lines):
+        for idx in line:
+            cell_lines[idx].append(line_id)
+        for length, found, cell_found in ((5, windows, cell_windows), (6, windows6, cell_windows6)):
+            for k in range(len(line) - length + 1):
+                window = line[k:k + length]
+                for idx in window:
+                    cell_found[idx].append(len(found))
+                found.append(window)
+
+    def span(window):
+        return slice(window[0], window[-1] + 1, window[1] - window[0])
+
+    NEIGHBOURS_1[:] = neighbours_1
+    LINES[:] = lines
+    CELL_LINES[:] = [tuple(ids) for ids in cell_lines]
+    LINE_SPANS[:] = [span(line) for line in lines]
+    WINDOWS[:] = windows
+    CELL_WINDOWS[:] = [tuple(ids) for ids in cell_windows]
+    WINDOW_SPANS[:] = [span(window) for window in windows]
+    WINDOWS6[:] = windows6
+    CELL_WINDOWS6[:] = [tuple(ids) for ids in cell_windows6]
+    WINDOW6_SPANS[:] = [span(window) for window in windows6]
+    WINDOW_SLICES[:] = window_slices
+    EMPTY_CELLS = bytearray(EMPTY if on_board[idx] else BORDER for idx in range(cell_count))
+
+    last = BOARD_SIZE - 1
+    transforms = (
+        lambda i, j: (i, j), lambda i, j: (j, last - i), lambda i, j: (last - i, last - j),
+        lambda i, j: (last - j, i), lambda i, j: (i, last - j), lambda i, j: (last - i, j),
+        lambda i, j: (j, i), lambda i, j: (last - j, last - i),
+    )
+    symmetry_maps = []
+    symmetry_inverses = []
+    for transform in transforms:
+        forward = list(range(cell_count))
+        inverse = list(range(cell_count))
+        for i in range(BOARD_SIZE):
+            for j in range(BOARD_SIZE):
+                idx, target = to_index(i, j), to_index(*transform(i, j))
+                forward[idx] = target
+                inverse[target] = idx
+        symmetry_maps.append(forward)
+        symmetry_inverses.append(inverse)
+    SYMMETRY_MAPS[:] = symmetry_maps
+    SYMMETRY_INVERSES[:] = symmetry_inverses
+    TABLE_BUILD_TIME = time.perf_counter() - start
+
+
+def build_zobrist():
+    """
+    为当前棋盘大小生成Zobrist哈希表
+    """
+    global ZOBRIST, ZOBRIST_INDEX
+    rng = random.Random(20230621)
+    ZOBRIST = [[[0, rng.getrandbits(64), rng.getrandbits(64)] for _ in range(BOARD_SIZE)]
+               for _ in range(BOARD_SIZE)]
+    ZOBRIST_INDEX = [None] * (PADDED_SIZE * PADDED_SIZE)
+    for i in range(BOARD_SIZE):
+        for j in range(BOARD_SIZE):
+            ZOBRIST_INDEX[to_index(i, j)] = ZOBRIST[i][j]
+
+
+def set_board_size(size):
+    """
+    设置棋盘大小，按新尺寸计算方向偏移并清空置换表等缓存；Zobrist表与预计算表推迟到第一次创建局面时构建
+    之前创建的 Position 对象在改变大小后不再可用
+    """
+    global BOARD_SIZE, PADDED_SIZE, DIRECTION_OFFSETS, TABLES_READY, nn_model
+    if size < 5:
+        raise ValueError("棋盘大小至少为5，当前为 %d" % size)
+    stop_pondering()
+    if size != BOARD_SIZE:
+        # 网络的增量更新表按旧棋盘的窗口编号构建，输入特征（各类窗口的数量）也随棋盘大小变化，关闭神经网络估价
+        nn_model = None
+    BOARD_SIZE = size
+    PADDED_SIZE = size + 2
+    DIRECTION_OFFSETS = tuple(dx * PADDED_SIZE + dy for dx, dy in DIRECTIONS)
+    TABLES_READY = False
+    transposition_table.clear()
+    symmetry_cache.clear()
+    line_cache.clear()
+
+
+def ensure_tables():
+    """
+    按需构建当前棋盘大小的Zobrist表与预计算表，分配估价缓存并读取已证明局面文件；已构建时直接返回
+    """
+    global TABLES_READY
+    if TABLES_READY:
+        return
+    build_zobrist()
+    build_tables()
+    history[:] = [0] * (PADDED_SIZE * PADDED_SIZE)
+    clear_eval_cache()
+    if PROVEN_AUTOSAVE:
+        load_proven_positions()
+    else:
+        proven_positions.clear()
+        del proven_pending[:]
+    TABLES_READY = True
+    if BACKEND != "python" and backend_module is None:
+        set_backend(BACKEND)
+    elif backend_module is not None:
+        backend_module.build_arrays()
+
+
+# 置换表：(局面哈希 << 1 | AI行棋) -> (剩余深度, 评分, 评分类型, 最佳位置下标)
+# 键含行棋方：提示分析交换双方颜色后搜索，同样的棋子布局轮到另一方时不能复用对方的评分与最佳位置
+# 必胜/必败评分按距该局面（而非根节点）的步数保存，换了根节点后复用仍然正确，见 score_to_tt / score_from_tt
+transposition_table = {}
+TT_MAX_SIZE = 1 << 20
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+# 神经网络估价模型（gobang_nn.NNModel），为 None 时使用棋形估价
+nn_model = None
+
+# 搜索内核后端："python"，或 "numba"（gobang_jit，需要安装 Numba，未安装时回退为 python）
+# 默认值取自环境变量 GOBANG_BACKEND，界面、服务与自我对弈的工作进程都会读取；运行中可用 set_backend 切换
+# 环境变量指定的后端在第一次建表时（ensure_tables）才加载：导入时加载会与 gobang_jit 循环导入
+BACKEND = os.environ.get("GOBANG_BACKEND", "python")
+backend_module = None
+
+# 威胁剪枝：存在成五、冲四或活三威胁时，只搜索应对威胁的位置
+THREAT_PRUNING = True
+
+# 静态搜索：主搜索到达深度0时，继续只搜索成五、冲四及其应对，避免水平线效应
+# QUIESCENCE_DEPTH 为最多延伸的步数，其中前 QUIESCENCE_FOUR_PLIES 步行棋方还可以主动冲四，之后只搜索成五与挡四
+# QUIESCENCE_NODE_LIMIT 为每次根节点搜索中静态搜索的节点上限
+QUIESCENCE = True
+QUIESCENCE_DEPTH = 8
+QUIESCENCE_FOUR_PLIES = 1
+QUIESCENCE_NODE_LIMIT = 20000
+
+# 后期着法缩减（LMR）：没有威胁的节点上，排在前 LMR_FULL_MOVES 个之后、且不形成四的着法
+# 先以零窗口少搜 LMR_REDUCTION 层，结果可能改善当前最佳值时再按完整深度重搜
+# 对弈测试中尚未显示出棋力收益，与空着裁剪一样默认关闭
+LMR = False
+LMR_MIN_DEPTH = 2
+LMR_FULL_MOVES = 4
+LMR_REDUCTION = 1
+
+# 空着裁剪：没有威胁的节点上先让行棋方“停一手”，对方以少 NULL_MOVE_REDUCTION 层的深度搜索后
+# 仍无法把评分拉回窗口内时直接剪枝；双方存在冲四、活三威胁时不做空着
+NULL_MOVE = False
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+
+# 历史启发：下标 -> 该位置引起剪枝的累计得分（深度的平方），用于没有置换表着法时的排序
+history = []
+
+# 搜索统计：累计搜索的节点数（含静态搜索节点）、静态搜索节点数、因威胁而缩小候选范围的节点数，
+# 以及空着剪枝、缩减搜索、缩减后重搜的次数
+search_stats = {"nodes": 0, "quiescence_nodes": 0, "threat_nodes": 0,
+                "null_cutoffs": 0, "reductions": 0, "re_searches": 0}
+quiescence_budget = [0]  # 本次根节点搜索剩余的静态搜索节点数
+
+# 搜索预算：search_stats["nodes"] 的上限与截止时间（perf_counter），由 search_with_budget 设置，平时不限制
+# 节点数每次都检查，时间每256个节点（约20 ms）检查一次
+search_limit = [float('inf'), float('inf')]
+
+# 难度等级：每步的节点预算。只以节点数为停止条件，走出的着法与机器速度无关（hard 在慢机器上每步可能要数十秒）
+# search_with_budget 以迭代加深搜索到 BUDGET_MAX_DEPTH 层或预算用完为止
+DIFFICULTY_LEVELS = {
+    "easy": {"nodes": 2000},
+    "medium": {"nodes": 20000},
+    "hard": {"nodes": 100000},
+}
+BUDGET_MAX_DEPTH = 8
+DIFFICULTY = None  # 为等级名时 search_move 按该等级的预算搜索，为 None 时按 MAX_DEPTH 定深搜索
+# 最近一次按预算搜索完成的深度、节点数、是否超出预算，以及指定着法（move 参数）在该深度的评分
+budget_stats = {"depth": -1, "nodes": 0, "aborted": False, "move_score": None}
+
+# 单线评分缓存：线的内容（bytes，各格为 EMPTY/BLACK/WHITE）-> 该线上双方的棋形得分（按颜色下标）
+# 兄弟节点之间绝大多数线不变，估价时只有从未见过的线需要逐窗口计算；表满时清空重建
+line_cache = {}
+LINE_CACHE_MAX_SIZE = 1 << 18
+line_cache_stats = {"lookups": 0, "hits": 0}
+
+# 估价缓存：局面哈希 -> 棋形估价评分，定长数组实现，EVAL_CACHE_BUCKETS 个桶、每桶 EVAL_CACHE_WAYS 个槽
+# 桶满时按时钟算法淘汰：从该桶的指针处开始，跳过并清除最近命中过的槽，替换第一个未被引用的槽
+# 键为0的槽视为空（空棋盘不需要缓存）
+EVAL_CACHE = True
+EVAL_CACHE_BUCKETS = 1 << 15
+EVAL_CACHE_WAYS = 4
+eval_cache_keys = array("Q")
+eval_cache_values = array("q")
+eval_cache_referenced = bytearray()
+eval_cache_hands = bytearray()
+eval_cache_stats = {"lookups": 0, "hits": 0, "evictions": 0}
+
+# 已证明胜负的局面缓存：(局面哈希 << 1 | AI行棋) -> 带符号的步数，正数表示AI在该步数内取胜，负数表示AI失败
+# 由主搜索和静态搜索（连续冲四）在证明胜负时写入，只在本进程内存中保留；
+# enable_proven_file 开启后（只有GUI使用）建表时读取文件，每次根节点搜索结束时把新记录追加到文件
+# 文件以 b"GPP1" 与 <B 棋盘大小开头，之后每条记录为 <QBb: 局面哈希, AI行棋, 带符号步数
+PROVEN_MAGIC = b"GPP1"
+PROVEN_RECORD = struct.Struct("<QBb")
+PROVEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "proven_%d.bin")  # %d 为棋盘大小
+PROVEN_MAX_SIZE = 1 << 20
+PROVEN_CACHE = True
+PROVEN_AUTOSAVE = False
+proven_positions = {}
+proven_pending = []  # 尚未写入文件的新记录
+proven_stats = {"hits": 0, "stored": 0}
+root_ply = [0]  # 本次根节点搜索开始时的落子数，用于计算到成五的步数
+root_move_score = [None]  # search_best_move 指定 move 时该着法的精确评分
+
+# 开局对称缓存：前若干手的局面经8种对称变换规范化后，缓存其最佳位置（规范坐标系下）
+# 规范哈希 -> (搜索深度, 最佳位置下标, 评分, 搜索所用节点数)
+SYMMETRY_CACHE_MOVES = 10
+symmetry_cache = {}
+symmetry_stats = {"lookups": 0, "hits": 0, "nodes_saved": 0}
+
+# 后台思考（ponder）状态：AI落子后，在玩家思考期间继续搜索预测的玩家应着
+search_stop = threading.Event()
+ponder_thread = None
+ponder_move = None    # 预测的玩家落子位置
+ponder_result = None  # 后台搜索得到的AI应着 (最佳位置, 评分)
+
+# 后台分析（提示）状态：多PV搜索在后台线程中进行，与后台思考共用中止事件与置换表
+ANALYSIS_COUNT = 3  # 默认给出的候选位置数
+analysis_thread = None
+analysis_result = None  # [(位置, 评分, 主要变例), ...]，搜索被中止时为 None
+
+
+class Position:
+    """
+    紧凑棋盘表示：带哨兵边框的一维 bytearray，附带落子栈与增量维护的Zobrist哈希
+    启用神经网络估价时，accumulator 为随落子/悔棋增量更新的隐藏层累加器
+    """
+    __slots__ = ("cells", "hash", "stack", "accumulator")
+
+    def __init__(self):
+        if not TABLES_READY:
+            ensure_tables()
+        self.cells = bytearray(EMPTY_CELLS)
+        self.hash = 0
+        self.stack = []
+        self.accumulator = None
+
+    @classmethod
+    def from_array(cls, game_board):
+        """
+        由二维棋盘（numpy 数组或嵌套列表）构造局面
+        """
+        if len(game_board) != BOARD_SIZE:
+            raise ValueError("棋盘大小 %d 与引擎设置 %d 不一致" % (len(game_board), BOARD_SIZE))
+        pos = cls()
+        for i, row in enumerate(game_board):
+            for j, color in enumerate(row):
+                if color != EMPTY:
+                    pos.play(to_index(i, j), int(color))
+        return pos
+
+    def to_array(self):
+        """
+        转换为 numpy 棋盘（numpy 只在此处按需导入）
+        """
+        import numpy as np
+        game_board = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
+        for idx in self.stack:
+            i, j = to_coord(idx)
+            game_board[i][j] = self.cells[idx]
+        return game_board
+
+    def copy(self):
+        pos = Position.__new__(Position)
+        pos.cells = bytearray(self.cells)
+        pos.hash = self.hash
+        pos.stack = list(self.stack)
+        pos.accumulator = self.accumulator.copy() if self.accumulator is not None else None
+        return pos
+
+    def play(self, idx, color):
+        """
+        在下标 idx 处落子
+        """
+        self.cells[idx] = color
+        self.hash ^= ZOBRIST_INDEX[idx][color]
+        self.stack.append(idx)
+        if self.accumulator is not None:
+            self.accumulator.play(idx, color)
+
+    def undo(self):
+        """
+        撤销最近一步落子
+        """
+        idx = self.stack.pop()
+        color = self.cells[idx]
+        self.hash ^= ZOBRIST_INDEX[idx][color]
+        self.cells[idx] = EMPTY
+        if self.accumulator is not None:
+            self.accumulator.undo(idx, color)
+
+    def goto(self, moves):
+        """
+        把局面变为落子序列 moves（[(下标, 颜色), ...]）：先悔棋到与当前落子栈的公共前缀，再依次落子
+        哈希与累加器随之增量更新；以哈希为键的置换表、估价缓存无需清空。返回 (悔棋步数, 落子步数)
+        """
+        common = 0
+        limit = min(len(self.stack), len(moves))
+        while common < limit and self.stack[common] == moves[common][0] and \
+                self.cells[moves[common][0]] == moves[common][1]:
+            common += 1
+        undone = len(self.stack) - common
+        for _ in range(undone):
+            self.undo()
+        for idx, color in moves[common:]:
+            self.play(idx, color)
+        return undone, len(moves) - common
+
+    def check_consistency(self, moves):
+        """
+        与按落子序列 moves 从头重建的局面比较落子栈、格子、哈希与累加器，返回不一致部分的名称列表
+        """
+        rebuilt = Position()
+        for idx, color in moves:
+            rebuilt.play(idx, color)
+        errors = [name for name in ("stack", "cells", "hash") if getattr(self, name) != getattr(rebuilt, name)]
+        if self.accumulator is not None:
+            fresh = self.accumulator.model.accumulator(rebuilt, self.accumulator.swapped)
+            if list(fresh.codes) != list(self.accumulator.codes) or \
+                    max(abs(a - b) for a, b in zip(fresh.hidden, self.accumulator.hidden)) > 1e-6:
+                errors.append("accumulator")
+        return errors
+
+    def is_win_at(self, idx):
+        """
+        判断经过 idx 的四条线上是否形成五连
+        """
+        cells = self.cells
+        color = cells[idx]
+        if color == EMPTY:
+            return False
+        for d in DIRECTION_OFFSETS:
+            count = 1
+            k = idx + d
+            while cells[k] == color:
+                count += 1
+                k += d
+            k = idx - d
+            while cells[k] == color:
+                count += 1
+                k -= d
+            if count >= 5:
+                return True
+        return False
+
+    def last_move_wins(self):
+        """
+        判断最近一步是否形成五连；搜索中只有最后一步可能结束游戏
+        """
+        return bool(self.stack) and self.is_win_at(self.stack[-1])
+
+    def winner(self):
+        """
+        扫描所有棋子，返回获胜方的颜色，如果没有人获胜则返回 None
+        """
+        for idx in self.stack:
+            if self.is_win_at(idx):
+                return self.cells[idx]
+        return None
+
+
+def get_valid_moves(pos):
+    """
+    获取当前棋局的合法移动位置（已有棋子周围一格内的空位下标），按下标升序
+    """
+    cells = pos.cells
+    moves = set()
+    for idx in pos.stack:
+        for n in NEIGHBOURS_1[idx]:
+            if cells[n] == EMPTY:
+                moves.add(n)
+    return sorted(moves)
+
+
+def threat_moves(pos, color, open_threes=True):
+    """
+    color 为行棋方，检查必须应对的威胁，返回限定后的候选位置；没有威胁时返回 None
+    1. 己方可以成五：只走成五的位置；
+    2. 对方有四（冲四或活四）：只走挡住成五的位置；
+    3. 对方有活三（open_threes 为 True 时检查）：走活三所在六格窗口内的空位，或者己方能形成四的反击位置。
+    窗口按编号顺序检查、返回的位置按下标升序，使结果与编译后端（gobang_jit）一致
+    """
+    cells = pos.cells
+    opponent = BLACK + WHITE - color
+    own_windows = set()
+    opponent_stones = []
+    for idx in pos.stack:
+        if cells[idx] == color:
+            own_windows.update(CELL_WINDOWS[idx])
+        else:
+            opponent_stones.append(idx)
+
+    for w in sorted(own_windows):
+        line = cells[WINDOW_SPANS[w]]
+        if line.count(color) == 4 and EMPTY in line:
+            return [WINDOWS[w][line.index(EMPTY)]]
+
+    opponent_windows = set()
+    for idx in opponent_stones:
+        opponent_windows.update(CELL_WINDOWS[idx])
+    blocks = set()
+    for w in opponent_windows:
+        line = cells[WINDOW_SPANS[w]]
+        if line.count(opponent) == 4 and EMPTY in line:
+            blocks.add(WINDOWS[w][line.index(EMPTY)])
+    if blocks:
+        return sorted(blocks)
+    if not open_threes:
+        return None
+
+    opponent_windows6 = set()
+    for idx in opponent_stones:
+        opponent_windows6.update(CELL_WINDOWS6[idx])
+    defences = set()
+    for w in opponent_windows6:
+        line = cells[WINDOW6_SPANS[w]]
+        if line[0] == EMPTY and line[5] == EMPTY and line.count(opponent) == 3 and line.count(EMPTY) == 3:
+            window = WINDOWS6[w]
+            defences.update(window[k] for k in range(6) if line[k] == EMPTY)
+    if not defences:
+        return None
+    defences.update(four_moves(pos, color))
+    return sorted(defences)
+
+
+def four_moves(pos, color):
+    """
+    color 方落子后能形成四（冲四或活四）的位置，按下标升序
+    """
+    cells = pos.cells
+    windows = set()
+    for idx in pos.stack:
+        if cells[idx] == color:
+            windows.update(CELL_WINDOWS[idx])
+    moves = set()
+    for w in windows:
+        line = cells[WINDOW_SPANS[w]]
+        if line.count(color) == 3 and line.count(EMPTY) == 2:
+            window = WINDOWS[w]
+            moves.update(window[k] for k in range(5) if line[k] == EMPTY)
+    return sorted(moves)
+
+
+def candidate_moves(pos, color):
+    """
+    color 方的候选位置：有威胁时只保留应对威胁的位置，否则为已有棋子周围的空位
+    返回 (候选位置, 是否因威胁而受限)
+    """
+    if THREAT_PRUNING:
+        forced = threat_moves(pos, color)
+        if forced is not None:
+            search_stats["threat_nodes"] += 1
+            return forced, True
+    return get_valid_moves(pos), False
+
+
+def line_scores(line):
+    """
+    计算一条线上双方的棋形得分 [0, 黑方, 白方]：与逐子统计一致，只计以己方棋子开头的五格窗口（五连、四、活三、活二）
+    """
+    scores = [0, 0, 0]
+    for k in range(len(line) - 4):
+        color = line[k]
+        if color == EMPTY:
+            continue
+        window = line[k:k + 5]
+        stone_count = window.count(color)
+        if stone_count == 5:
+            scores[color] += WEIGHTS["five"]
+        elif stone_count == 4 and EMPTY in window:
+            scores[color] += WEIGHTS["open_four"]
+        elif stone_count == 3 and window.count(EMPTY) == 2:
+            scores[color] += WEIGHTS["open_three"]
+        elif stone_count == 2 and window.count(EMPTY) == 3:
+            scores[color] += WEIGHTS["open_two"]
+    return scores
+
+
+def evaluate_both(pos):
+    """
+    双方的棋形得分 [0, 黑方, 白方]：累加所有经过棋子的线的得分，线的得分从单线评分缓存中读取
+    """
+    cells = pos.cells
+    line_ids = set()
+    for idx in pos.stack:
+        line_ids.update(CELL_LINES[idx])
+    black = white = 0
+    hits = 0
+    for line_id in line_ids:
+        key = bytes(cells[LINE_SPANS[line_id]])
+        scores = line_cache.get(key)
+        if scores is None:
+            if len(line_cache) >= LINE_CACHE_MAX_SIZE:
+                line_cache.clear()
+            scores = line_cache[key] = line_scores(key)
+        else:
+            hits += 1
+        black += scores[BLACK]
+        white += scores[WHITE]
+    line_cache_stats["lookups"] += len(line_ids)
+    line_cache_stats["hits"] += hits
+    return [0, black, white]
+
+
+def evaluate_position(pos, color):
+    """
+    评估当前棋局的得分
+    """
+    return evaluate_both(pos)[color]
+
+
+def pattern_counts(pos, color):
+    """
+    统计 color 方各棋形的数量（顺序同 PATTERNS），与 evaluate_position 的判定规则一致，用于调参
+    """
+    cells = pos.cells
+    counts = [0, 0, 0, 0]
+    for idx in pos.stack:
+        if cells[idx] != color:
+            continue
+        for window in WINDOW_SLICES[idx]:
+            line = cells[window]
+            stone_count = line.count(color)
+            if stone_count == 5:
+                counts[0] += 1
+            elif stone_count == 4 and EMPTY in line:
+                counts[1] += 1
+            elif stone_count == 3 and line.count(EMPTY) == 2:
+                counts[2] += 1
+            elif stone_count == 2 and line.count(EMPTY) == 3:
+                counts[3] += 1
+    return counts
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """
+    从权重文件读取棋形权重并覆盖 WEIGHTS，文件不存在时保持默认值；返回是否读取成功
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    WEIGHTS.update({name: int(round(data[name])) for name in WEIGHTS if name in data})
+    transposition_table.clear()
+    symmetry_cache.clear()
+    line_cache.clear()
+    if TABLES_READY:
+        clear_eval_cache()
+    if backend_module is not None:
+        backend_module.build_arrays()
+    return True
+
+
+def set_nn_evaluator(path=None):
+    """
+    启用（path 为模型文件）或关闭（path 为 None）神经网络估价，并清空依赖估价结果的缓存；
+    模型按当前棋盘大小使用，set_board_size 改变大小后需重新启用
+    """
+    global nn_model
+    if path is None:
+        nn_model = None
+    else:
+        import gobang_nn
+        nn_model = gobang_nn.NNModel.load(path)
+    transposition_table.clear()
+    symmetry_cache.clear()
+
+
+def attach_accumulator(pos):
+    """
+    启用神经网络估价时为根局面创建累加器。搜索总以 AI_COLOR 行棋，而真实对局黑方先行：
+    根局面落子数为偶数说明轮到的其实是黑方，调用方交换了颜色，累加器按真实颜色计算特征
+    """
+    if nn_model is not None and pos.accumulator is None:
+        pos.accumulator = nn_model.accumulator(pos, swapped=len(pos.stack) % 2 == 0)
+
+
+def set_backend(name):
+    """
+    切换候选位置生成、威胁检测、冲四位置、五连判断与棋形估价所用的实现，返回实际使用的后端名
+    落子与悔棋只改动一个格子，保持为纯Python：调用编译函数的开销比它们本身还大
+    """
+    global BACKEND, backend_module
+    if name not in ("python", "numba"):
+        raise ValueError("未知的后端 %s" % name)
+    module = None
+    if name == "numba":
+        import gobang_jit
+        if gobang_jit.NUMBA_AVAILABLE:
+            module = gobang_jit
+        else:
+            warnings.warn("未安装 Numba，使用纯Python后端")
+    kernels = module.KERNELS if module is not None else PYTHON_KERNELS
+    globals().update((key, func) for key, func in kernels.items() if key != "is_win_at")
+    Position.is_win_at = kernels["is_win_at"]
+    BACKEND = "numba" if module is not None else "python"
+    backend_module = module
+    if module is not None and TABLES_READY:
+        module.build_arrays()
+    transposition_table.clear()
+    symmetry_cache.clear()
+    if TABLES_READY:
+        clear_eval_cache()
+    return BACKEND
+
+
+def static_score(pos, won=False):
+    """
+    叶节点评分（AI视角）。最近一步成五时为 ±(WIN_SCORE - 距根节点步数)；
+    否则默认使用棋形估价，启用神经网络估价时改用网络输出
+    """
+    if won:
+        score = WIN_SCORE - (len(pos.stack) - root_ply[0])
+        return score if pos.cells[pos.stack[-1]] == AI_COLOR else -score
+    if nn_model is not None and pos.accumulator is not None:
+        return nn_model.score(pos.accumulator, AI_COLOR)
+    if not EVAL_CACHE or not pos.hash:
+        scores = evaluate_both(pos)
+        return scores[AI_COLOR] - scores[PLAYER_COLOR]
+
+    board_hash = pos.hash
+    eval_cache_stats["lookups"] += 1
+    base = (board_hash & (EVAL_CACHE_BUCKETS - 1)) * EVAL_CACHE_WAYS
+    for slot in range(base, base + EVAL_CACHE_WAYS):
+        if eval_cache_keys[slot] == board_hash:
+            eval_cache_stats["hits"] += 1
+            eval_cache_referenced[slot] = 1
+            return eval_cache_values[slot]
+    scores = evaluate_both(pos)
+    score = scores[AI_COLOR] - scores[PLAYER_COLOR]
+    bucket = base // EVAL_CACHE_WAYS
+    hand = eval_cache_hands[bucket]
+    while eval_cache_referenced[base + hand]:
+        eval_cache_referenced[base + hand] = 0
+        hand = (hand + 1) % EVAL_CACHE_WAYS
+    slot = base + hand
+    if eval_cache_keys[slot]:
+        eval_cache_stats["evictions"] += 1
+    eval_cache_keys[slot] = board_hash
+    eval_cache_values[slot] = score
+    eval_cache_referenced[slot] = 1
+    eval_cache_hands[bucket] = (hand + 1) % EVAL_CACHE_WAYS
+    return score
+
+
+def clear_eval_cache():
+    """
+    按当前的桶数与每桶槽数重新分配（清空）估价缓存
+    """
+    slots = EVAL_CACHE_BUCKETS * EVAL_CACHE_WAYS
+    eval_cache_keys[:] = array("Q", bytes(8 * slots))
+    eval_cache_values[:] = array("q", bytes(8 * slots))
+    eval_cache_referenced[:] = bytes(slots)
+    eval_cache_hands[:] = bytes(EVAL_CACHE_BUCKETS)
+
+
+def is_game_over(game_board):
+    """
+    检查游戏是否结束，即是否有一方获胜
+    返回获胜方的颜色，如果没有人获胜则返回 None
+    """
+    if not isinstance(game_board, Position):
+        game_board = Position.from_array(game_board)
+    return game_board.winner()
+
+
+def order_moves(moves, key):
+    """
+    按历史启发得分排序，并将置换表中记录的最佳位置排在最前，提高剪枝效率
+    """
+    moves.sort(key=history.__getitem__, reverse=True)
+    entry = transposition_table.get(key)
+    if entry is not None and entry[3] in moves:
+        moves.remove(entry[3])
+        moves.insert(0, entry[3])
+    return moves
+
+
+def score_to_tt(value, ply):
+    """
+    把距根节点 ply 步的局面评分换算为写入置换表的形式：必胜/必败评分改为相对该局面的步数
+    """
+    if value >= WIN_THRESHOLD:
+        return value + ply
+    if value <= -WIN_THRESHOLD:
+        return value - ply
+    return value
+
+
+def score_from_tt(value, ply):
+    """
+    score_to_tt 的逆变换：把置换表中的评分换算为相对当前根节点的评分
+    """
+    if value >= WIN_THRESHOLD:
+        return value - ply
+    if value <= -WIN_THRESHOLD:
+        return value + ply
+    return value
+
+
+def position_key(pos, maximizing_player):
+    """
+    置换表与已证明局面缓存的键：局面哈希加上行棋方（AI行棋为1）
+    """
+    return pos.hash << 1 | maximizing_player
+
+
+def probe_proven(pos, maximizing_player):
+    """
+    查询已证明胜负的缓存，命中时返回换算到当前步数的评分，否则返回 None
+    """
+    if not PROVEN_CACHE:
+        return None
+    distance = proven_positions.get(position_key(pos, maximizing_player))
+    if distance is None:
+        return None
+    proven_stats["hits"] += 1
+    score = WIN_SCORE - (len(pos.stack) - root_ply[0]) - abs(distance)
+    return score if distance > 0 else -score
+
+
+def record_proof(pos, value, flag, maximizing_player):
+    """
+    评分证明了胜负时写入缓存：AI胜需要评分是下界或精确值，AI负需要评分是上界或精确值
+    """
+    if not PROVEN_CACHE:
+        return
+    if value >= WIN_THRESHOLD and flag != TT_UPPER:
+        sign = 1
+    elif value <= -WIN_THRESHOLD and flag != TT_LOWER:
+        sign = -1
+    else:
+        return
+    key = position_key(pos, maximizing_player)
+    if key in proven_positions or len(proven_positions) >= PROVEN_MAX_SIZE:
+        return
+    distance = min(WIN_SCORE - abs(value) - (len(pos.stack) - root_ply[0]), 127)
+    if distance <= 0:
+        return
+    proven_positions[key] = sign * distance
+    proven_pending.append(key)
+    proven_stats["stored"] += 1
+
+
+def proven_path():
+    """
+    当前棋盘大小的已证明局面文件路径
+    """
+    return PROVEN_FILE % BOARD_SIZE if "%d" in PROVEN_FILE else PROVEN_FILE
+
+
+def enable_proven_file(path=None):
+    """
+    开启已证明局面文件（path 省略时为模块旁的 proven_<大小>.bin）：读取已有记录，之后每次根节点搜索结束时追加
+    """
+    global PROVEN_FILE, PROVEN_AUTOSAVE
+    if path:
+        PROVEN_FILE = path
+    PROVEN_AUTOSAVE = True
+    if TABLES_READY:
+        return load_proven_positions()
+    return 0
+
+
+def load_proven_positions(path=None):
+    """
+    读取当前棋盘大小的已证明局面文件（替换内存中的缓存），返回读取的记录数
+    """
+    proven_positions.clear()
+    del proven_pending[:]
+    path = path or proven_path()
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        data = f.read()
+    header = len(PROVEN_MAGIC) + 1
+    if not data:
+        return 0
+    if data[:len(PROVEN_MAGIC)] != PROVEN_MAGIC or data[len(PROVEN_MAGIC):header] != bytes([BOARD_SIZE]):
+        raise ValueError("%s 不是 %d 路棋盘的已证明局面文件" % (path, BOARD_SIZE))
+    usable = header + (len(data) - header) // PROVEN_RECORD.size * PROVEN_RECORD.size
+    for board_hash, ai_to_move, distance in PROVEN_RECORD.iter_unpack(memoryview(data)[header:usable]):
+        proven_positions[board_hash << 1 | ai_to_move] = distance
+    return len(proven_positions)
+
+
+def save_proven_positions(path=None):
+    """
+    把尚未保存的已证明局面追加到文件，返回写入的记录数
+    写入时对文件加排他锁（有 fcntl 时），多个进程同时写同一文件也只会写一次文件头，记录不会交错
+    """
+    if not proven_pending:
+        return 0
+    path = path or proven_path()
+    records = b"".join(PROVEN_RECORD.pack(key >> 1, key & 1, proven_positions[key]) for key in proven_pending)
+    with open(path, "ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0, os.SEEK_END)
+        f.write((PROVEN_MAGIC + struct.pack("<B", BOARD_SIZE) if f.tell() == 0 else b"") + records)
+    count = len(proven_pending)
+    del proven_pending[:]
+    return count
+
+
+def clear_search_state(proven=True):
+    """
+    清空置换表、对称缓存、估价缓存、历史启发，以及（proven 为 True 时）内存中的已证明局面（不改动文件），
+    使下一次搜索的结果不受本进程之前搜索的影响
+    """
+    transposition_table.clear()
+    symmetry_cache.clear()
+    clear_eval_cache()
+    history[:] = [0] * len(history)
+    if proven:
+        proven_positions.clear()
+        del proven_pending[:]
+
+
+class SearchAborted(Exception):
+    """
+    后台思考被中止时抛出，用于快速退出递归搜索
+    """
+
+
+class SearchBudgetExceeded(SearchAborted):
+    """
+    超出节点或时间预算时抛出，search_with_budget 据此结束迭代加深
+    """
+
+
+def alpha_beta_search(pos, depth, alpha, beta, maximizing_player, allow_null=True):
+    """
+    使用Alpha-Beta剪枝进行博弈树搜索，并利用置换表复用已搜索过的局面
+    没有威胁的节点上可以做空着裁剪（allow_null 为 False 时不做，避免连续空着）与后期着法缩减
+    """
+    if search_stop.is_set():
+        raise SearchAborted()
+    # 超出预算的节点不计入，按预算搜索的总节点数恰好不超过预算
+    nodes = search_stats["nodes"] + 1
+    if nodes > search_limit[0] or (not nodes & 255 and time.perf_counter() > search_limit[1]):
+        raise SearchBudgetExceeded()
+    search_stats["nodes"] = nodes
+
+    key = position_key(pos, maximizing_player)
+    ply = len(pos.stack) - root_ply[0]
+    entry = transposition_table.get(key)
+    if entry is not None and entry[0] >= depth:
+        _, value, flag, _ = entry
+        value = score_from_tt(value, ply)
+        if flag == TT_EXACT:
+            return value
+        if flag == TT_LOWER and value >= beta:
+            return value
+        if flag == TT_UPPER and value <= alpha:
+            return value
+
+    won = pos.last_move_wins()
+    if won:
+        return static_score(pos, True)
+    if depth == 0:
+        if QUIESCENCE:
+            return quiescence_search(pos, alpha, beta, maximizing_player, QUIESCENCE_DEPTH)
+        return static_score(pos)
+    proven = probe_proven(pos, maximizing_player)
+    if proven is not None:
+        return proven
+
+    color = AI_COLOR if maximizing_player else PLAYER_COLOR
+    opponent = BLACK + WHITE - color
+    moves, forced = candidate_moves(pos, color)
+    if (NULL_MOVE and allow_null and not forced and depth >= NULL_MOVE_MIN_DEPTH
+            and pos.accumulator is None and not four_moves(pos, color) and not four_moves(pos, opponent)):
+        # 网络估价含行棋方特征，空着会使其失真，因此只在棋形估价下使用
+        bound = beta if maximizing_player else alpha
+        if abs(bound) != float('inf'):
+            pos.hash ^= ZOBRIST_NULL
+            try:
+                if maximizing_player:
+                    value = alpha_beta_search(pos, depth - 1 - NULL_MOVE_REDUCTION, beta - 1, beta, False, False)
+                else:
+                    value = alpha_beta_search(pos, depth - 1 - NULL_MOVE_REDUCTION, alpha, alpha + 1, True, False)
+            finally:
+                pos.hash ^= ZOBRIST_NULL
+            if (value >= beta) if maximizing_player else (value <= alpha):
+                search_stats["null_cutoffs"] += 1
+                return bound
+
+    reducible = LMR and not forced and depth >= LMR_MIN_DEPTH and len(moves) > LMR_FULL_MOVES
+    fours = four_moves(pos, color) if reducible else ()
+    alpha_orig, beta_orig = alpha, beta
+    best_move = None
+    valid_moves = order_moves(moves, key)
+    if maximizing_player:
+        max_eval = float('-inf')
+        for n, move in enumerate(valid_moves):
+            pos.play(move, AI_COLOR)
+            try:
+                if reducible and n >= LMR_FULL_MOVES and move not in fours and alpha != float('-inf'):
+                    search_stats["reductions"] += 1
+                    evaluation = alpha_beta_search(pos, depth - 1 - LMR_REDUCTION, alpha, alpha + 1, False)
+                    if evaluation > alpha:
+                        search_stats["re_searches"] += 1
+                        evaluation = alpha_beta_search(pos, depth - 1, alpha, beta, False)
+                else:
+                    evaluation = alpha_beta_search(pos, depth - 1, alpha, beta, False)
+            finally:
+                pos.undo()
+            if evaluation > max_eval:
+                max_eval, best_move = evaluation, move
+            alpha = max(alpha, evaluation)
+            if beta <= alpha:
+                break
+        result = max_eval
+    else:
+        min_eval = float('inf')
+        for n, move in enumerate(valid_moves):
+            pos.play(move, PLAYER_COLOR)
+            try:
+                if reducible and n >= LMR_FULL_MOVES and move not in fours and beta != float('inf'):
+                    search_stats["reductions"] += 1
+                    evaluation = alpha_beta_search(pos, depth - 1 - LMR_REDUCTION, beta - 1, beta, True)
+                    if evaluation < beta:
+                        search_stats["re_searches"] += 1
+                        evaluation = alpha_beta_search(pos, depth - 1, alpha, beta, True)
+                else:
+                    evaluation = alpha_beta_search(pos, depth - 1, alpha, beta, True)
+            finally:
+                pos.undo()
+            if evaluation < min_eval:
+                min_eval, best_move = evaluation, move
+            beta = min(beta, evaluation)
+            if beta <= alpha:
+                break
+        result = min_eval
+
+    if best_move is not None and beta <= alpha:
+        history[best_move] += depth * depth
+    if result <= alpha_orig:
+        flag = TT_UPPER
+    elif result >= beta_orig:
+        flag = TT_LOWER
+    else:
+        flag = TT_EXACT
+    store_entry(key, depth, score_to_tt(result, ply), flag, best_move)
+    record_proof(pos, result, flag, maximizing_player)
+    return result
+
+
+def quiescence_search(pos, alpha, beta, maximizing_player, depth):
+    """
+    静态搜索：若行棋方能成五或必须挡四，只搜索这些着法；否则可以“停着”取静态评分，
+    在前 QUIESCENCE_FOUR_PLIES 步内还可以走能形成四的着法。超过延伸步数或节点上限时直接返回静态评分
+    """
+    if search_stop.is_set():
+        raise SearchAborted()
+    nodes = search_stats["nodes"] + 1
+    if nodes > search_limit[0] or (not nodes & 255 and time.perf_counter() > search_limit[1]):
+        raise SearchBudgetExceeded()
+    search_stats["nodes"] = nodes
+    search_stats["quiescence_nodes"] += 1
+    quiescence_budget[0] -= 1
+    proven = probe_proven(pos, maximizing_player)
+    if proven is not None:
+        return proven
+
+    alpha_orig, beta_orig = alpha, beta
+    color = AI_COLOR if maximizing_player else PLAYER_COLOR
+    forced = threat_moves(pos, color, open_threes=False)
+    if forced is None:
+        stand_pat = static_score(pos)
+        if depth == 0 or quiescence_budget[0] <= 0:
+            return stand_pat
+        if maximizing_player:
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+        else:
+            if stand_pat <= alpha:
+                return stand_pat
+            beta = min(beta, stand_pat)
+        if depth <= QUIESCENCE_DEPTH - QUIESCENCE_FOUR_PLIES:
+            return stand_pat
+        moves = four_moves(pos, color)
+        best = stand_pat
+    else:
+        if depth == 0 or quiescence_budget[0] <= 0:
+            return static_score(pos)
+        moves = forced
+        best = float('-inf') if maximizing_player else float('inf')
+
+    for move in moves:
+        pos.play(move, color)
+        try:
+            if pos.is_win_at(move):
+                value = static_score(pos, True)
+            else:
+                value = quiescence_search(pos, alpha, beta, not maximizing_player, depth - 1)
+        finally:
+            pos.undo()
+        if maximizing_player:
+            best = max(best, value)
+            alpha = max(alpha, value)
+        else:
+            best = min(best, value)
+            beta = min(beta, value)
+        if beta <= alpha:
+            break
+    # 连续冲四证明了胜负时写入已证明局面缓存
+    record_proof(pos, best, TT_UPPER if best <= alpha_orig else TT_LOWER if best >= beta_orig else TT_EXACT,
+                 maximizing_player)
+    return best
+
+
+def store_entry(key, depth, value, flag, best_move):
+    """
+    写入置换表，表满时清空重建；根节点以外的评分需先经 score_to_tt 换算
+    """
+    if len(transposition_table) >= TT_MAX_SIZE:
+        transposition_table.clear()
+    old = transposition_table.get(key)
+    if old is None or old[0] <= depth:
+        transposition_table[key] = (depth, value, flag, best_move)
+
+
+def search_best_move(pos, move=None):
+    """
+    根节点搜索，返回 (最佳位置, 评分)，结果同时写入置换表
+    给出 move（下标）时先以完整窗口搜索该着法，其精确评分写入 root_move_score[0]（复盘时评实际落子）
+    """
+    if not isinstance(pos, Position):
+        pos = Position.from_array(pos)
+    attach_accumulator(pos)
+    root_key = position_key(pos, True)
+    entry = transposition_table.get(root_key)
+    if move is None and entry is not None and entry[0] >= MAX_DEPTH + 1 and entry[2] == TT_EXACT:
+        return to_coord(entry[3]), entry[1]
+
+    quiescence_budget[0] = QUIESCENCE_NODE_LIMIT
+    root_ply[0] = len(pos.stack)
+    early = move is None and len(pos.stack) <= SYMMETRY_CACHE_MOVES
+    if early:
+        key, t, cached = probe_symmetry_cache(pos)
+        if cached is not None:
+            store_entry(root_key, MAX_DEPTH + 1, cached[1], TT_EXACT, cached[0])
+            return to_coord(cached[0]), cached[1]
+
+    nodes_before = search_stats["nodes"]
+    best_score = float('-inf')
+    best_move = None
+    # 历史启发得分逐次减半，让排序偏向最近局面中有效的位置
+    history[:] = [h >> 1 for h in history]
+    moves = order_moves(candidate_moves(pos, AI_COLOR)[0], root_key)
+    if move is not None:
+        pos.play(move, AI_COLOR)
+        try:
+            root_move_score[0] = alpha_beta_search(pos, MAX_DEPTH, float('-inf'), float('inf'), False)
+        finally:
+            pos.undo()
+        # 指定着法不在候选位置中（威胁剪枝排除）时只给出评分，不参与选择
+        if move in moves:
+            moves.remove(move)
+            best_score, best_move = root_move_score[0], move
+    for move in moves:
+        pos.play(move, AI_COLOR)
+        try:
+            score = alpha_beta_search(pos, MAX_DEPTH, best_score, float('inf'), False)
+        finally:
+            pos.undo()
+        if score > best_score:
+            best_score = score
+            best_move = move
+    if best_move is None:
+        return None, best_score
+    store_entry(root_key, MAX_DEPTH + 1, best_score, TT_EXACT, best_move)
+    record_proof(pos, best_score, TT_EXACT, True)
+    if PROVEN_AUTOSAVE:
+        save_proven_positions()
+    if early:
+        symmetry_cache[key] = (MAX_DEPTH, SYMMETRY_MAPS[t][best_move], best_score,
+                               search_stats["nodes"] - nodes_before)
+    return to_coord(best_move), best_score
+
+
+def principal_variation(pos, move, length):
+    """
+    从根节点着法 move 出发，沿置换表中记录的最佳位置走出主要变例（最多 length 步），返回坐标列表
+    """
+    line = []
+    color = AI_COLOR
+    try:
+        while len(line) < length and pos.cells[move] == EMPTY:
+            pos.play(move, color)
+            line.append(move)
+            if pos.last_move_wins():
+                break
+            entry = transposition_table.get(position_key(pos, color == PLAYER_COLOR))
+            if entry is None or entry[3] is None:
+                break
+            move = entry[3]
+            color = PLAYER_COLOR if color == AI_COLOR else AI_COLOR
+    finally:
+        for _ in line:
+            pos.undo()
+    return [to_coord(idx) for idx in line]
+
+
+def analyse_position(pos, count=ANALYSIS_COUNT):
+    """
+    多PV搜索（AI_COLOR 行棋）：返回评分最高的 count 个位置 [(位置, 评分, 主要变例), ...]，按评分从高到低
+    以当前第 count 好的评分为下界搜索其余着法，只有可能进入前 count 名的着法才得到精确评分；
+    子局面的结果留在置换表中，对同一局面再次分析时基本只需查表
+    """
+    if not isinstance(pos, Position):
+        pos = Position.from_array(pos)
+    attach_accumulator(pos)
+    quiescence_budget[0] = QUIESCENCE_NODE_LIMIT
+    root_ply[0] = len(pos.stack)
+    root_key = position_key(pos, True)
+    best = []  # [(评分, 位置下标)]，评分从高到低
+    for move in order_moves(candidate_moves(pos, AI_COLOR)[0], root_key):
+        alpha = best[count - 1][0] if len(best) >= count else float('-inf')
+        pos.play(move, AI_COLOR)
+        try:
+            score = alpha_beta_search(pos, MAX_DEPTH, alpha, float('inf'), False)
+        finally:
+            pos.undo()
+        if score > alpha:
+            best.append((score, move))
+            best.sort(key=lambda item: -item[0])
+            del best[count:]
+    if not best:
+        return []
+    store_entry(root_key, MAX_DEPTH + 1, best[0][0], TT_EXACT, best[0][1])
+    return [(to_coord(move), score, principal_variation(pos, move, MAX_DEPTH + 1)) for score, move in best]
+
+
+def score_move(pos, move):
+    """
+    AI_COLOR 在根节点落在 move（下标）的精确评分，与 search_best_move 同深度，可复用其置换表结果
+    """
+    attach_accumulator(pos)
+    quiescence_budget[0] = QUIESCENCE_NODE_LIMIT
+    root_ply[0] = len(pos.stack)
+    pos.play(move, AI_COLOR)
+    try:
+        return alpha_beta_search(pos, MAX_DEPTH, float('-inf'), float('inf'), False)
+    finally:
+        pos.undo()
+
+
+def analyse(pos, count):
+    """
+    后台分析线程的入口，搜索被中止时结果保持为 None
+    """
+    global analysis_result
+    try:
+        analysis_result = analyse_position(pos, count)
+    except SearchAborted:
+        pass
+
+
+def start_analysis(game_board, color=AI_COLOR, count=ANALYSIS_COUNT):
+    """
+    在后台分析 color 方的最佳落子（提示），先结束正在进行的后台思考与分析
+    color 为玩家时交换双方棋子，让引擎以 AI_COLOR 的视角搜索
+    """
+    global analysis_thread, analysis_result
+    stop_pondering()
+    stop_analysis()
+    if color != AI_COLOR:
+        swap = {AI_COLOR: PLAYER_COLOR, PLAYER_COLOR: AI_COLOR, EMPTY: EMPTY}
+        game_board = [[swap[cell] for cell in row] for row in game_board]
+    pos = Position.from_array(game_board)
+    if pos.winner():
+        return
+    analysis_thread = threading.Thread(target=analyse, args=(pos, count), daemon=True)
+    analysis_thread.start()
+
+
+def analysis_done():
+    """
+    后台分析是否已结束（供界面轮询，不阻塞）
+    """
+    return analysis_thread is None or not analysis_thread.is_alive()
+
+
+def stop_analysis(wait=False):
+    """
+    结束后台分析并返回其结果。wait 为 True 时等待分析完成，否则立即中止（未完成时返回 None）
+    """
+    global analysis_thread, analysis_result
+    if analysis_thread is None:
+        return None
+    if not wait:
+        search_stop.set()
+    analysis_thread.join()
+    search_stop.clear()
+    result = analysis_result
+    analysis_thread, analysis_result = None, None
+    return result
+
+
+def search_with_budget(pos, nodes=None, seconds=None, max_depth=BUDGET_MAX_DEPTH, move=None):
+    """
+    迭代加深搜索：依次以深度0、1、2……调用 search_best_move，超出节点或时间预算时中止当前一层，
+    返回最后完成的一层的 (最佳位置, 评分)。深度0总是完整搜索，保证有着可走；
+    每层都复用上一层写入置换表的最佳位置排序。给出 move 时该着法在同一深度的评分记入 budget_stats["move_score"]
+    限定节点数时在独立的状态上搜索：空置换表、清零的历史启发，不查已证明局面与开局对称缓存，
+    未触及时间上限时结果只取决于局面与预算，与机器速度、负载以及此前搜索过哪些局面无关；
+    完成后把本次的置换表并入原置换表，供提示、预测应着复用
+    """
+    global MAX_DEPTH, PROVEN_CACHE, SYMMETRY_CACHE_MOVES, transposition_table, history
+    if not isinstance(pos, Position):
+        pos = Position.from_array(pos)
+    saved = MAX_DEPTH, PROVEN_CACHE, SYMMETRY_CACHE_MOVES, transposition_table, history
+    if nodes is not None:
+        transposition_table, history = {}, [0] * len(history)
+        PROVEN_CACHE = False
+        SYMMETRY_CACHE_MOVES = -1
+    start_nodes = search_stats["nodes"]
+    start_time = time.perf_counter()
+    result = (None, float('-inf'))
+    budget_stats.update(depth=-1, aborted=False, move_score=None)
+    try:
+        for depth in range(max_depth + 1):
+            MAX_DEPTH = depth
+            if depth > 0:
+                search_limit[0] = float('inf') if nodes is None else start_nodes + nodes
+                search_limit[1] = float('inf') if seconds is None else start_time + seconds
+            try:
+                result = search_best_move(pos, move)
+            except SearchBudgetExceeded:
+                budget_stats["aborted"] = True
+                break
+            budget_stats["depth"] = depth
+            if move is not None:
+                budget_stats["move_score"] = root_move_score[0]
+            if result[0] is None or abs(result[1]) >= WIN_THRESHOLD:
+                break
+    finally:
+        search_limit[:] = [float('inf'), float('inf')]
+        budget_stats["nodes"] = search_stats["nodes"] - start_nodes
+        table = transposition_table
+        MAX_DEPTH, PROVEN_CACHE, SYMMETRY_CACHE_MOVES, transposition_table, history = saved
+        if table is not transposition_table:
+            transposition_table.update(table)
+    return result
+
+
+def search_move(pos):
+    """
+    按当前设置搜索：DIFFICULTY 为等级名时按该等级的预算，否则按 MAX_DEPTH 定深
+    """
+    if DIFFICULTY is None:
+        return search_best_move(pos)
+    return search_with_budget(pos, **DIFFICULTY_LEVELS[DIFFICULTY])
+
+
+@contextlib.contextmanager
+def search_settings(**settings):
+    """
+    临时修改搜索设置（MAX_DEPTH、LMR、NULL_MOVE 等模块级变量），退出时恢复
+    """
+    module = globals()
+    saved = {name: module[name] for name in settings}
+    module.update(settings)
+    try:
+        yield
+    finally:
+        module.update(saved)
+
+
+def canonical_hash(pos):
+    """
+    计算局面在8种对称变换下哈希值的最小值，返回 (规范哈希, 对应的变换编号)
+    """
+    cells = pos.cells
+    best = None
+    for t, mapping in enumerate(SYMMETRY_MAPS):
+        h = 0
+        for idx in pos.stack:
+            h ^= ZOBRIST_INDEX[mapping[idx]][cells[idx]]
+        if best is None or h < best[0]:
+            best = (h, t)
+    return best
+
+
+def probe_symmetry_cache(pos):
+    """
+    在开局对称缓存中查找局面，命中时把缓存的最佳位置经逆变换映射回当前局面
+    """
+    symmetry_stats["lookups"] += 1
+    key, t = canonical_hash(pos)
+    entry = symmetry_cache.get(key)
+    if entry is None or entry[0] < MAX_DEPTH:
+        return key, t, None
+    move = SYMMETRY_INVERSES[t][entry[1]]
+    if pos.cells[move] != EMPTY:
+        return key, t, None
+    symmetry_stats["hits"] += 1
+    symmetry_stats["nodes_saved"] += entry[3]
+    return key, t, (move, entry[2])
+
+
+def predict_reply(pos):
+    """
+    根据置换表中的主要变例（PV）预测玩家的下一步落子
+    """
+    entry = transposition_table.get(position_key(pos, False))
+    if entry is None or entry[3] is None or pos.cells[entry[3]] != EMPTY:
+        return None
+    return to_coord(entry[3])
+
+
+def ponder(pos, move):
+    """
+    后台思考：假设玩家落在预测位置，提前搜索AI的应着
+    """
+    global ponder_result
+    pos.play(to_index(*move), PLAYER_COLOR)
+    try:
+        ponder_result = search_move(pos)
+    except SearchAborted:
+        pass
+
+
+def start_pondering(game_board):
+    """
+    AI落子后启动后台思考线程
+    """
+    global ponder_thread, ponder_move, ponder_result
+    pos = Position.from_array(game_board)
+    ponder_move = predict_reply(pos)
+    ponder_result = None
+    if ponder_move is None or pos.winner():
+        return
+    ponder_thread = threading.Thread(target=ponder, args=(pos, ponder_move), daemon=True)
+    ponder_thread.start()
+
+
+def stop_pondering(actual_move=None):
+    """
+    结束后台思考。若玩家实际落子与预测一致，等待搜索完成并返回其结果；否则中止搜索并返回 None
+    """
+    global ponder_thread, ponder_move, ponder_result
+    if ponder_thread is None:
+        return None
+    hit = actual_move is not None and actual_move == ponder_move
+    if not hit:
+        search_stop.set()
+    ponder_thread.join()
+    search_stop.clear()
+    result = ponder_result if hit else None
+    ponder_thread, ponder_move, ponder_result = None, None, None
+    return result
+
+
+# 按默认棋盘大小初始化（各类表在第一次创建局面时才构建），并读取调参得到的权重
+set_board_size(BOARD_SIZE)
+load_weights()
+# 纯Python实现，set_backend("python") 时恢复
+PYTHON_KERNELS = {
+    "get_valid_moves": get_valid_moves,
+    "threat_moves": threat_moves,
+    "four_moves": four_moves,
+    "evaluate_both": evaluate_both,
+    "is_win_at": Position.is_win_at,
+}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="五子棋AI引擎工具（性能测试与一致性检查见 gobang_bench.py）")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="报告进程启动（含解释器与标准库）、导入引擎、建表与第一次搜索的耗时")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    ensure_tables()
+    tables_time = time.perf_counter() - start
+    if args.profile_startup:
+        first_board = [[EMPTY] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        first_board[BOARD_SIZE // 2][BOARD_SIZE // 2] = PLAYER_COLOR
+        start = time.perf_counter()
+        search_best_move(first_board)
+        search_time = time.perf_counter() - start
+        # 导入耗时在新进程中从进程创建起测量，包括解释器启动与标准库导入
+        from gobang_profile import startup_times
+        baseline, total, imports = startup_times("gobang_engine")
+        print("解释器空启动:           %6.1f ms" % (baseline * 1000))
+        print("启动并导入引擎:         %6.1f ms（比空启动多 %.1f ms）" % (total * 1000, (total - baseline) * 1000))
+        print("构建表与缓存:           %6.1f ms" % (tables_time * 1000))
+        print("引擎就绪合计:           %6.1f ms" % ((total + tables_time) * 1000))
+        print("第一次搜索:             %6.1f ms" % (search_time * 1000))
+        print("导入耗时最多的模块（-X importtime，不含子模块）:")
+        for name, elapsed in imports[:8]:
+            print("  %-20s %6.1f ms" % (name, elapsed * 1000))
+    print("预计算表构建耗时: %.2f ms（%d 条线，%d 个五格窗口）" % (TABLE_BUILD_TIME * 1000, len(LINES), len(WINDOWS)))
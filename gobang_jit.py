@@ -0,0 +1,237 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 可选的 Numba 编译后端：在 int8 NumPy 视图（与 Position.cells 共享内存）上实现
+      候选位置生成、威胁检测、冲四位置、五连判断与棋形估价，由 engine.set_backend("numba") 启用。
+      未安装 Numba 时 njit 退化为普通函数，本模块仍可导入（用于核对逻辑），但引擎会回退到纯Python后端。
+      命令行：verify 在基准局面上核对两个后端的着法与评分完全一致，bench 比较每秒搜索节点数（基准局面见 gobang_bench）。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+
+import numpy as np
+
+import gobang_engine as engine
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+EMPTY, BLACK, WHITE = engine.EMPTY, engine.BLACK, engine.WHITE
+
+# 当前棋盘大小的表（NumPy 形式），由 build_arrays 构建
+# NEIGHBOURS: 每个位置周围一格内的位置（不足8个时以-1补齐），WINDOWS5 / WINDOWS6: 五格、六格窗口
+# OFFSETS: 四个方向的下标偏移，WEIGHTS: 五连、四、活三、活二的权重
+NEIGHBOURS = np.zeros((0, 8), np.int32)
+WINDOWS5 = np.zeros((0, 5), np.int32)
+WINDOWS6 = np.zeros((0, 6), np.int32)
+OFFSETS = np.zeros(4, np.int64)
+WEIGHTS = np.zeros(4, np.int64)
+
+
+def build_arrays():
+    """
+    按引擎当前的棋盘大小与权重构建 NumPy 表
+    """
+    global NEIGHBOURS, WINDOWS5, WINDOWS6, OFFSETS, WEIGHTS
+    engine.ensure_tables()
+    neighbours = np.full((engine.PADDED_SIZE * engine.PADDED_SIZE, 8), -1, np.int32)
+    for idx, cells in enumerate(engine.NEIGHBOURS_1):
+        neighbours[idx, :len(cells)] = cells
+    NEIGHBOURS = neighbours
+    WINDOWS5 = np.array(engine.WINDOWS, np.int32)
+    WINDOWS6 = np.array(engine.WINDOWS6, np.int32)
+    OFFSETS = np.array(engine.DIRECTION_OFFSETS, np.int64)
+    WEIGHTS = np.array([engine.WEIGHTS[name] for name in ("five", "open_four", "open_three", "open_two")], np.int64)
+
+
+@njit(cache=True)
+def _valid_moves(cells, neighbours):
+    out = np.empty(cells.shape[0], np.int64)
+    count = 0
+    for idx in range(cells.shape[0]):
+        if cells[idx] != EMPTY:
+            continue
+        for k in range(8):
+            n = neighbours[idx, k]
+            if n < 0:
+                break
+            if cells[n] == BLACK or cells[n] == WHITE:
+                out[count] = idx
+                count += 1
+                break
+    return out[:count]
+
+
+@njit(cache=True)
+def _is_win(cells, idx, offsets):
+    color = cells[idx]
+    if color == EMPTY:
+        return False
+    for d in offsets:
+        count = 1
+        k = idx + d
+        while cells[k] == color:
+            count += 1
+            k += d
+        k = idx - d
+        while cells[k] == color:
+            count += 1
+            k -= d
+        if count >= 5:
+            return True
+    return False
+
+
+@njit(cache=True)
+def _count(cells, window, color):
+    count = 0
+    for idx in window:
+        if cells[idx] == color:
+            count += 1
+    return count
+
+
+@njit(cache=True)
+def _mark_fours(cells, color, windows5, marks):
+    for w in range(windows5.shape[0]):
+        window = windows5[w]
+        if _count(cells, window, color) == 3 and _count(cells, window, EMPTY) == 2:
+            for idx in window:
+                if cells[idx] == EMPTY:
+                    marks[idx] = True
+
+
+@njit(cache=True)
+def _four_moves(cells, color, windows5):
+    marks = np.zeros(cells.shape[0], np.bool_)
+    _mark_fours(cells, color, windows5, marks)
+    return np.nonzero(marks)[0]
+
+
+@njit(cache=True)
+def _threat_moves(cells, color, open_threes, windows5, windows6):
+    """
+    返回 (是否有威胁, 候选位置)，规则与检查顺序同 engine.threat_moves
+    """
+    opponent = BLACK + WHITE - color
+    for w in range(windows5.shape[0]):
+        window = windows5[w]
+        if _count(cells, window, color) == 4 and _count(cells, window, EMPTY) == 1:
+            for idx in window:
+                if cells[idx] == EMPTY:
+                    return True, np.array([idx], np.int64)
+
+    marks = np.zeros(cells.shape[0], np.bool_)
+    found = False
+    for w in range(windows5.shape[0]):
+        window = windows5[w]
+        if _count(cells, window, opponent) == 4 and _count(cells, window, EMPTY) == 1:
+            for idx in window:
+                if cells[idx] == EMPTY:
+                    marks[idx] = True
+                    found = True
+    if found or not open_threes:
+        return found, np.nonzero(marks)[0]
+
+    for w in range(windows6.shape[0]):
+        window = windows6[w]
+        if (cells[window[0]] == EMPTY and cells[window[5]] == EMPTY
+                and _count(cells, window, opponent) == 3 and _count(cells, window, EMPTY) == 3):
+            for idx in window:
+                if cells[idx] == EMPTY:
+                    marks[idx] = True
+                    found = True
+    if found:
+        _mark_fours(cells, color, windows5, marks)
+    return found, np.nonzero(marks)[0]
+
+
+@njit(cache=True)
+def _evaluate(cells, windows5, weights):
+    """
+    双方的棋形得分，只计以己方棋子开头的五格窗口，同 engine.line_scores
+    """
+    scores = np.zeros(3, np.int64)
+    for w in range(windows5.shape[0]):
+        window = windows5[w]
+        color = cells[window[0]]
+        if color != BLACK and color != WHITE:
+            continue
+        stones = _count(cells, window, color)
+        empties = _count(cells, window, EMPTY)
+        if stones == 5:
+            scores[color] += weights[0]
+        elif stones == 4 and empties == 1:
+            scores[color] += weights[1]
+        elif stones == 3 and empties == 2:
+            scores[color] += weights[2]
+        elif stones == 2 and empties == 3:
+            scores[color] += weights[3]
+    return scores
+
+
+def _view(pos):
+    return np.frombuffer(pos.cells, np.int8)
+
+
+def get_valid_moves(pos):
+    return _valid_moves(_view(pos), NEIGHBOURS).tolist()
+
+
+def threat_moves(pos, color, open_threes=True):
+    found, moves = _threat_moves(_view(pos), color, open_threes, WINDOWS5, WINDOWS6)
+    return moves.tolist() if found else None
+
+
+def four_moves(pos, color):
+    return _four_moves(_view(pos), color, WINDOWS5).tolist()
+
+
+def evaluate_both(pos):
+    return _evaluate(_view(pos), WINDOWS5, WEIGHTS).tolist()
+
+
+def is_win_at(pos, idx):
+    return bool(_is_win(_view(pos), idx, OFFSETS))
+
+
+# engine.set_backend 用这些函数替换同名的纯Python实现（is_win_at 替换 Position 的方法）
+KERNELS = {
+    "get_valid_moves": get_valid_moves,
+    "threat_moves": threat_moves,
+    "four_moves": four_moves,
+    "evaluate_both": evaluate_both,
+    "is_win_at": is_win_at,
+}
+
+
+if __name__ == "__main__":
+    from gobang_bench import corpus, run_corpus
+    parser = argparse.ArgumentParser(description="Numba 后端：一致性核对与性能测试")
+    parser.add_argument("command", choices=["verify", "bench"])
+    parser.add_argument("--positions", type=int, default=20, help="随机中局局面数")
+    parser.add_argument("--depth", type=int, default=engine.MAX_DEPTH, help="搜索深度")
+    args = parser.parse_args()
+    if not NUMBA_AVAILABLE:
+        print("未安装 Numba，numba 后端将回退为纯Python")
+    engine.MAX_DEPTH = args.depth
+    boards = corpus(args.positions)
+    run_corpus("numba", boards[:1])  # 预先编译，不计入耗时
+    python_results, python_nodes, python_time = run_corpus("python", boards)
+    numba_results, numba_nodes, numba_time = run_corpus("numba", boards)
+    engine.set_backend("python")
+    if args.command == "verify":
+        mismatches = [n for n, (a, b) in enumerate(zip(python_results, numba_results)) if a != b]
+        print("%d 个局面，着法与评分不一致 %d 个%s" % (len(boards), len(mismatches),
+                                              "：%s" % mismatches if mismatches else ""))
+        print("节点数 python %d / numba %d" % (python_nodes, numba_nodes))
+    print("python: %7.0f 节点/秒（%.2f s）" % (python_nodes / python_time, python_time))
+    print("numba:  %7.0f 节点/秒（%.2f s）" % (numba_nodes / numba_time, numba_time))
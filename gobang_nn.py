@@ -0,0 +1,266 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 小型NumPy神经网络估价（仅CPU）
+      输入为棋形特征：按 (黑子数, 白子数) 统计所有五格窗口的数量（36维），外加“白方行棋”1维；
+      一个隐藏层（ReLU），输出为黑方胜率的 logit。
+      隐藏层输入 W1 @ x 保存在累加器中，落子/悔棋只影响经过该点的约20个窗口，
+      累加器按这些窗口的类别变化增量更新，叶节点估价只需一次 ReLU 和点积。
+      引擎搜索时总以 AI_COLOR 行棋，调用方为另一方搜索时会交换棋盘上的颜色；
+      此时累加器以 swapped=True 创建，按真实颜色计算特征与评分（网络学到的黑方先手优势不被颠倒）。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+import gobang_engine as engine
+from gobang_selfplay import iter_samples
+
+# 窗口类别：黑子数 * 6 + 白子数
+CATEGORIES = 36
+STM_FEATURE = CATEGORIES  # 白方行棋
+INPUTS = CATEGORIES + 1
+COLOR_STEP = {engine.BLACK: 6, engine.WHITE: 1}
+
+# 网络输出 logit 乘以该系数作为搜索评分，使其量级与棋形估价相当且远小于五连
+SCORE_SCALE = 10000
+
+DEFAULT_HIDDEN = 32
+
+
+def real_color(color, swapped):
+    """
+    棋盘上的颜色对应的真实颜色
+    """
+    return engine.BLACK + engine.WHITE - color if swapped else color
+
+
+def window_codes(pos, swapped=False):
+    """
+    从头计算每个五格窗口的类别（按真实颜色）
+    """
+    black, white = real_color(engine.BLACK, swapped), real_color(engine.WHITE, swapped)
+    cells = pos.cells
+    codes = np.zeros(len(engine.WINDOWS), dtype=np.int64)
+    for w, window in enumerate(engine.WINDOWS):
+        line = bytes(cells[idx] for idx in window)
+        codes[w] = line.count(black) * 6 + line.count(white)
+    return codes
+
+
+def features(pos, swapped=False):
+    """
+    局面的输入特征向量；行棋方由落子数决定，与颜色是否交换无关
+    """
+    x = np.bincount(window_codes(pos, swapped), minlength=CATEGORIES).astype(float)
+    return np.append(x, len(pos.stack) % 2)
+
+
+class NNModel:
+    """
+    单隐藏层网络的参数，及为当前棋盘大小预先计算的增量更新表
+    """
+
+    def __init__(self, w1, b1, w2, b2):
+        self.w1 = w1  # (INPUTS, hidden)
+        self.b1 = b1
+        self.w2 = w2
+        self.b2 = float(b2)
+        # delta[color][code]: 窗口类别从 code 变为 code + COLOR_STEP[color] 时隐藏层输入的变化
+        self.delta = {}
+        for color, step in COLOR_STEP.items():
+            table = np.zeros_like(w1[:CATEGORIES])
+            table[:CATEGORIES - step] = w1[step:CATEGORIES] - w1[:CATEGORIES - step]
+            self.delta[color] = table
+        engine.ensure_tables()
+        self.cell_windows = [np.array(ids, dtype=np.int64) for ids in engine.CELL_WINDOWS]
+
+    @classmethod
+    def random(cls, hidden=DEFAULT_HIDDEN, seed=0):
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.1, (INPUTS, hidden)), np.zeros(hidden), rng.normal(0, 0.1, hidden), 0.0)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["w1"], data["b1"], data["w2"], data["b2"])
+
+    def save(self, path):
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+    def accumulator(self, pos, swapped=False):
+        return Accumulator(self, pos, swapped)
+
+    def forward(self, x):
+        """
+        批量前向计算，x 形状为 (样本数, INPUTS)，返回 (logit, 隐藏层输出)
+        """
+        hidden = np.maximum(x @ self.w1 + self.b1, 0)
+        return hidden @ self.w2 + self.b2, hidden
+
+    def score(self, acc, color):
+        """
+        由累加器给出棋盘上 color 方视角的评分
+        """
+        logit = np.maximum(acc.hidden, 0) @ self.w2 + self.b2
+        return int(logit * SCORE_SCALE) * (1 if real_color(color, acc.swapped) == engine.BLACK else -1)
+
+
+class Accumulator:
+    """
+    隐藏层输入累加器：hidden = b1 + W1 @ x，随落子/悔棋增量更新；swapped 表示棋盘颜色与真实颜色相反
+    """
+    __slots__ = ("model", "swapped", "codes", "hidden")
+
+    def __init__(self, model, pos=None, swapped=False):
+        self.model = model
+        self.swapped = swapped
+        if pos is not None:
+            self.codes = window_codes(pos, swapped)
+            self.hidden = model.b1 + features(pos, swapped) @ model.w1
+
+    def copy(self):
+        acc = Accumulator(self.model, swapped=self.swapped)
+        acc.codes = self.codes.copy()
+        acc.hidden = self.hidden.copy()
+        return acc
+
+    def play(self, idx, color):
+        color = real_color(color, self.swapped)
+        model = self.model
+        windows = model.cell_windows[idx]
+        old = self.codes[windows]
+        self.codes[windows] = old + COLOR_STEP[color]
+        self.hidden += model.delta[color][old].sum(axis=0)
+        # 落子后行棋方改变
+        if color == engine.BLACK:
+            self.hidden += model.w1[STM_FEATURE]
+        else:
+            self.hidden -= model.w1[STM_FEATURE]
+
+    def undo(self, idx, color):
+        color = real_color(color, self.swapped)
+        model = self.model
+        windows = model.cell_windows[idx]
+        old = self.codes[windows] - COLOR_STEP[color]
+        self.codes[windows] = old
+        self.hidden -= model.delta[color][old].sum(axis=0)
+        if color == engine.BLACK:
+            self.hidden -= model.w1[STM_FEATURE]
+        else:
+            self.hidden += model.w1[STM_FEATURE]
+
+
+def load_training_set(path, limit=None):
+    """
+    从自我对弈样本构造训练集：特征与黑方结果（胜1 / 和0.5 / 负0）
+    """
+    xs, ys = [], []
+    for sample in itertools.islice(iter_samples(path), limit):
+        xs.append(features(sample.position()))
+        black_result = sample.result if sample.side_to_move() == engine.BLACK else -sample.result
+        ys.append((black_result + 1) / 2)
+    return np.array(xs), np.array(ys)
+
+
+def train(x, y, hidden=DEFAULT_HIDDEN, epochs=200, lr=0.01, batch=256, seed=0):
+    """
+    以交叉熵为损失、Adam 优化训练网络，返回模型
+    """
+    model = NNModel.random(hidden, seed)
+    scale = np.maximum(x.std(axis=0), 1.0)
+    x = x / scale
+    params = [model.w1, model.b1, model.w2, np.array([model.b2])]
+    moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+    rng = np.random.default_rng(seed)
+    t = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(y))
+        for start in range(0, len(y), batch):
+            rows = order[start:start + batch]
+            xb, yb = x[rows], y[rows]
+            model.b2 = params[3][0]
+            logit, h = model.forward(xb)
+            g_logit = (1 / (1 + np.exp(-logit)) - yb) / len(rows)
+            g_h = np.outer(g_logit, model.w2) * (h > 0)
+            grads = [xb.T @ g_h, g_h.sum(axis=0), h.T @ g_logit, np.array([g_logit.sum()])]
+            t += 1
+            for p, g, (m, v) in zip(params, grads, moments):
+                m *= 0.9
+                m += 0.1 * g
+                v *= 0.999
+                v += 0.001 * g * g
+                p -= lr * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-8)
+        if epoch % max(epochs // 10, 1) == 0 or epoch == epochs - 1:
+            model.b2 = params[3][0]
+            p = 1 / (1 + np.exp(-model.forward(x)[0]))
+            loss = -np.mean(y * np.log(p + 1e-9) + (1 - y) * np.log(1 - p + 1e-9))
+            print("第 %d 轮  损失 %.4f" % (epoch, loss))
+    # 把输入归一化并入第一层权重，推理时直接使用原始特征
+    return NNModel(model.w1 / scale[:, None], model.b1, model.w2, params[3][0])
+
+
+def benchmark(model, positions=200, plies=40, seed=0):
+    """
+    比较神经网络估价（含一次落子+悔棋的增量更新）与棋形估价每秒可完成的次数
+    """
+    rng = np.random.default_rng(seed)
+    center = engine.BOARD_SIZE // 2
+    samples = []
+    for _ in range(positions):
+        pos = engine.Position()
+        while len(pos.stack) < plies:
+            i, j = center + rng.integers(-5, 6), center + rng.integers(-5, 6)
+            idx = engine.to_index(int(i), int(j))
+            if pos.cells[idx] == engine.EMPTY:
+                pos.play(idx, engine.BLACK if len(pos.stack) % 2 == 0 else engine.WHITE)
+        moves = engine.get_valid_moves(pos)
+        pos.accumulator = model.accumulator(pos)
+        samples.append((pos, moves[0]))
+
+    start = time.perf_counter()
+    for pos, move in samples:
+        pos.play(move, engine.WHITE)
+        model.score(pos.accumulator, engine.WHITE)
+        pos.undo()
+    nn_rate = len(samples) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for pos, move in samples:
+        pos.play(move, engine.WHITE)
+        scores = engine.evaluate_both(pos)
+        scores[engine.WHITE] - scores[engine.BLACK]
+        pos.undo()
+    pattern_rate = len(samples) / (time.perf_counter() - start)
+
+    for pos, _ in samples:
+        assert np.allclose(pos.accumulator.hidden, model.b1 + features(pos) @ model.w1)
+    return nn_rate, pattern_rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="神经网络估价：训练与性能测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("train", help="用自我对弈样本训练网络")
+    p.add_argument("samples", help="自我对弈样本文件或目录")
+    p.add_argument("-o", "--output", default="nn_eval.npz")
+    p.add_argument("--hidden", type=int, default=DEFAULT_HIDDEN)
+    p.add_argument("--epochs", type=int, default=200)
+    p.add_argument("--limit", type=int, help="最多使用的样本数")
+    p = sub.add_parser("bench", help="测试每秒估价次数")
+    p.add_argument("model", nargs="?", help="模型文件，省略时使用随机权重")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        x, y = load_training_set(args.samples, args.limit)
+        print("训练样本 %d 条" % len(y))
+        train(x, y, args.hidden, args.epochs).save(args.output)
+        print("模型已写入 %s" % args.output)
+    else:
+        nn = NNModel.load(args.model) if args.model else NNModel.random()
+        nn_per_sec, pattern_per_sec = benchmark(nn)
+        print("神经网络估价（含增量更新）: %.0f 次/秒" % nn_per_sec)
+        print("棋形估价:                   %.0f 次/秒" % pattern_per_sec)
@@ -0,0 +1,243 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 常驻的五子棋引擎工作进程池：
+      1. 同一局的请求总是发往同一个工作进程，复用该局的置换表与历史启发；
+      2. 工作进程启动时预先构建各类表并预热开局对称缓存（相当于开局库）；
+      3. 短时间内到达同一工作进程的请求合并成一批发送，减少进程间通信；
+      4. 按工作进程统计请求延迟的分位数。
+GitHub: RyanZzzzq
+"""
+
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import gobang_engine as engine
+
+# 每个工作进程最多保留多少局的置换表与历史启发，超出时淘汰最久未使用的一局
+GAMES_PER_WORKER = 64
+
+# 请求合并的时间窗口（秒）与每批最多请求数
+BATCH_WINDOW = 0.002
+BATCH_SIZE = 8
+
+# 每个工作进程保留的延迟样本数
+LATENCY_SAMPLES = 1000
+
+# 预热开局缓存时考虑的中心区域半径
+OPENING_RADIUS = 2
+
+
+def run_search(stones, depth, seconds=None):
+    """
+    按落子列表 [(i, j, color), ...] 构造局面并搜索，返回 (最佳位置, 评分, 节点数, 耗时)
+    depth 为整数时定深搜索，为难度等级名（engine.DIFFICULTY_LEVELS）时按该等级的节点预算搜索；
+    给出 seconds 时另以此为时间上限（迭代加深，超时则采用已完成的最深一层）
+    """
+    pos = engine.Position()
+    for i, j, color in stones:
+        pos.play(engine.to_index(i, j), color)
+    nodes_before = engine.search_stats["nodes"]
+    start = time.perf_counter()
+    if isinstance(depth, str):
+        budget = dict(engine.DIFFICULTY_LEVELS[depth])
+        move, score = engine.search_with_budget(pos, seconds=seconds, **budget)
+    elif seconds is not None:
+        move, score = engine.search_with_budget(pos, seconds=seconds, max_depth=depth)
+    else:
+        saved_depth = engine.MAX_DEPTH
+        engine.MAX_DEPTH = depth
+        try:
+            move, score = engine.search_best_move(pos)
+        finally:
+            engine.MAX_DEPTH = saved_depth
+    return move, score, engine.search_stats["nodes"] - nodes_before, time.perf_counter() - start
+
+
+def warm_opening_cache():
+    """
+    预先搜索玩家第一手落在中心区域的所有局面，结果写入开局对称缓存
+    """
+    center = engine.BOARD_SIZE // 2
+    game_board = [[engine.EMPTY] * engine.BOARD_SIZE for _ in range(engine.BOARD_SIZE)]
+    for i in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1):
+        for j in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1):
+            game_board[i][j] = engine.PLAYER_COLOR
+            engine.search_best_move(game_board)
+            game_board[i][j] = engine.EMPTY
+    engine.transposition_table.clear()
+
+
+def _worker_main(board_size, requests, results, worker_id):
+    """
+    工作进程主循环：每次取出一批请求，切换到对应对局的置换表与历史启发后依次搜索，逐个返回结果
+    请求格式 (请求编号, 对局编号, 落子列表, 深度, 时间上限)，落子列表为 None 表示释放该局的置换表
+    """
+    # 已证明局面只留在本进程内存中，不读写文件（以 fork 启动时可能继承了父进程的设置）
+    engine.PROVEN_AUTOSAVE = False
+    engine.set_board_size(board_size)
+    warm_opening_cache()
+    tables = OrderedDict()
+    results.put((worker_id, None))
+    while True:
+        batch = requests.get()
+        if batch is None:
+            break
+        for request_id, game_id, stones, depth, seconds in batch:
+            if stones is None:
+                tables.pop(game_id, None)
+                continue
+            state = tables.pop(game_id, None)
+            if state is None:
+                state = ({}, [0] * len(engine.history))
+                if len(tables) >= GAMES_PER_WORKER:
+                    tables.popitem(last=False)
+            tables[game_id] = state
+            engine.transposition_table, engine.history = state
+            # 每个结果单独返回，批内靠后的请求不会拖慢靠前的请求
+            try:
+                reply = (request_id, True, run_search(stones, depth, seconds))
+            except Exception as exc:  # 把异常交回调用方，工作进程继续服务
+                reply = (request_id, False, repr(exc))
+            results.put((worker_id, reply))
+
+
+class EnginePool:
+    """
+    常驻引擎进程池，submit 返回 concurrent.futures.Future，可在线程或 asyncio 中等待
+    """
+
+    def __init__(self, workers, board_size, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.affinity = {}
+        self.games_on_worker = [0] * workers
+        self.pending = {}
+        self.latencies = [deque(maxlen=LATENCY_SAMPLES) for _ in range(workers)]
+        self.batches = [0] * workers
+        self.request_ids = itertools.count()
+        self.lock = threading.Lock()
+        self.inbox = queue.Queue()
+        self.results = multiprocessing.Queue()
+        self.requests = [multiprocessing.Queue() for _ in range(workers)]
+        self.processes = [multiprocessing.Process(target=_worker_main, daemon=True,
+                                                  args=(board_size, self.requests[w], self.results, w))
+                          for w in range(workers)]
+        for process in self.processes:
+            process.start()
+        # 等待所有工作进程完成预热
+        for _ in range(workers):
+            self.results.get()
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.dispatcher.start()
+        self.collector.start()
+
+    def _worker_for(self, game_id):
+        """
+        返回对局绑定的工作进程，新对局分配给当前对局数最少的进程
+        """
+        worker = self.affinity.get(game_id)
+        if worker is None:
+            worker = min(range(self.workers), key=self.games_on_worker.__getitem__)
+            self.affinity[game_id] = worker
+            self.games_on_worker[worker] += 1
+        return worker
+
+    def submit(self, game_id, stones, depth, seconds=None):
+        future = Future()
+        with self.lock:
+            worker = self._worker_for(game_id)
+            request_id = next(self.request_ids)
+            self.pending[request_id] = (future, worker, time.perf_counter())
+        self.inbox.put((worker, (request_id, game_id, list(stones), depth, seconds)))
+        return future
+
+    def release(self, game_id):
+        """
+        对局结束，通知工作进程丢弃该局的置换表
+        """
+        with self.lock:
+            worker = self.affinity.pop(game_id, None)
+            if worker is None:
+                return
+            self.games_on_worker[worker] -= 1
+        self.inbox.put((worker, (None, game_id, None, 0, None)))
+
+    def _dispatch(self):
+        """
+        合并时间窗口内到达的请求，按工作进程分批发送
+        """
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                return
+            grouped = {}
+            deadline = time.perf_counter() + self.batch_window
+            while item is not None:
+                worker, request = item
+                batch = grouped.setdefault(worker, [])
+                batch.append(request)
+                if len(batch) >= self.batch_size:
+                    self._send(worker, grouped.pop(worker))
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.inbox.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.inbox.put(None)
+            for worker, batch in grouped.items():
+                self._send(worker, batch)
+
+    def _send(self, worker, batch):
+        self.batches[worker] += 1
+        self.requests[worker].put(batch)
+
+    def _collect(self):
+        """
+        接收工作进程的结果，完成对应的 Future 并记录延迟
+        """
+        while True:
+            item = self.results.get()
+            if item is None:
+                return
+            worker, (request_id, ok, value) = item
+            with self.lock:
+                future, _, submitted = self.pending.pop(request_id)
+            self.latencies[worker].append(time.perf_counter() - submitted)
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def latency_percentiles(self):
+        """
+        返回每个工作进程的请求数、批次数与延迟分位数（秒）
+        """
+        report = []
+        for worker, samples in enumerate(self.latencies):
+            values = sorted(samples)
+            entry = {"worker": worker, "games": self.games_on_worker[worker],
+                     "requests": len(values), "batches": self.batches[worker]}
+            for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+                entry[name] = values[int(q * (len(values) - 1))] if values else 0.0
+            report.append(entry)
+        return report
+
+    def close(self):
+        self.inbox.put(None)
+        self.dispatcher.join()
+        for request_queue in self.requests:
+            request_queue.put(None)
+        for process in self.processes:
+            process.join()
+        self.results.put(None)
+        self.collector.join()
@@ -0,0 +1,139 @@
+"""
+-*- coding: utf-8 -*-
+Desc: AI落子的性能剖析
+      1. MoveProfiler 用 cProfile 包装落子函数，每一步写出 move_<序号>.prof（pstats 格式），
+         并在同名 .json 中附上该步之前的局面（落子序列）、棋盘大小与耗时，便于复现耗时异常的局面；
+      2. 命令行报告工具汇总一个目录（一局）中所有步的剖析结果，列出最耗时的函数与最慢的几步。
+      用法: python Gobang_v2.0.py --profile-moves DIR，之后 python gobang_profile.py DIR
+      3. 启动耗时：从进程创建起计时（含解释器启动与标准库导入），供 --profile-startup 使用。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import cProfile
+import functools
+import glob
+import json
+import os
+import pstats
+import subprocess
+import sys
+import time
+
+from gobang_record import GameRecord, to_renju_notation
+
+
+class MoveProfiler:
+    """
+    按步剖析：wrap 返回的函数每次调用都在 cProfile 下运行，并把结果写入 directory
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.count = len(glob.glob(os.path.join(directory, "move_*.prof")))
+
+    def wrap(self, func, position):
+        """
+        position() 返回调用前的 (落子序列, 棋盘大小)，随剖析结果一起保存
+        """
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            moves, size = position()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                self.save(profiler, moves, size, time.perf_counter() - start)
+        return profiled
+
+    def save(self, profiler, moves, size, elapsed):
+        name = os.path.join(self.directory, "move_%04d" % self.count)
+        self.count += 1
+        profiler.dump_stats(name + ".prof")
+        with open(name + ".json", "w", encoding="utf-8") as f:
+            json.dump({"size": size, "moves": [list(move) for move in moves], "elapsed": elapsed}, f)
+
+
+def process_elapsed():
+    """
+    本进程从创建到现在的墙钟时间（秒），含解释器启动与所有导入；读取 /proc（Linux），精度为一个时钟节拍（通常10 ms），
+    其他系统返回 None
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # 进程名可能含空格，从最后一个 ")" 之后数字段，starttime 是第22个字段
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def startup_times(module, runs=5):
+    """
+    在新进程中测量启动耗时，各取 runs 次中的最小值，返回 (空解释器进程耗时, 导入 module 的进程耗时, 模块导入耗时)
+    模块导入耗时来自 python -X importtime：[(模块名, 不含其子模块的导入耗时), ...]，按耗时降序
+    """
+    def run(*argv):
+        best, stderr = float("inf"), ""
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, *argv], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    capture_output=True, text=True, check=True)
+            best = min(best, time.perf_counter() - start)
+            stderr = result.stderr
+        return best, stderr
+
+    baseline, _ = run("-c", "pass")
+    total, stderr = run("-X", "importtime", "-c", "import " + module)
+    imports = []
+    # 每行为 "import time: 自身(us) | 累计(us) | 模块名"
+    for line in stderr.splitlines():
+        fields = line.partition("import time:")[2].split("|")
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            imports.append((fields[2].strip(), int(fields[0]) / 1e6))
+    imports.sort(key=lambda item: -item[1])
+    return baseline, total, imports
+
+
+def load_moves(directory):
+    """
+    读取目录中各步的附加信息，返回 [(剖析文件, 信息字典), ...]，按序号排列
+    """
+    entries = []
+    for prof in sorted(glob.glob(os.path.join(directory, "move_*.prof"))):
+        with open(prof[:-len(".prof")] + ".json", encoding="utf-8") as f:
+            entries.append((prof, json.load(f)))
+    return entries
+
+
+def report(directory, top=20, sort="cumulative", slowest=5):
+    """
+    打印所有步汇总后最耗时的 top 个函数，以及耗时最长的 slowest 步及其局面
+    """
+    entries = load_moves(directory)
+    if not entries:
+        raise ValueError("%s 中没有剖析结果" % directory)
+    total = sum(info["elapsed"] for _, info in entries)
+    print("共 %d 步，总耗时 %.2f s，平均 %.3f s" % (len(entries), total, total / len(entries)))
+    print("\n最慢的 %d 步:" % min(slowest, len(entries)))
+    for prof, info in sorted(entries, key=lambda entry: -entry[1]["elapsed"])[:slowest]:
+        record = GameRecord([tuple(move) for move in info["moves"]], info["size"])
+        print("  %s  %.3f s  %d 手  %s" % (os.path.basename(prof), info["elapsed"], len(record.moves),
+                                          to_renju_notation(record)))
+    print()
+    stats = pstats.Stats(*[prof for prof, _ in entries])
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="汇总AI落子的剖析结果")
+    parser.add_argument("directory", help="--profile-moves 指定的目录")
+    parser.add_argument("--top", type=int, default=20, help="列出的函数数")
+    parser.add_argument("--sort", default="cumulative", choices=["cumulative", "tottime", "ncalls"], help="排序方式")
+    parser.add_argument("--slowest", type=int, default=5, help="列出的最慢步数")
+    args = parser.parse_args()
+    report(args.directory, args.top, args.sort, args.slowest)
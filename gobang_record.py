@@ -0,0 +1,287 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 五子棋棋谱的紧凑二进制格式与批量读写
+      文件以 b"GBR1" 开头，之后依次存放各局棋谱，每局的格式为：
+          头部 <HBBHHBB: 步数, 棋盘大小, 结果, 基本用时(秒), 每步加秒, 黑方名字长度, 白方名字长度
+          黑方名字、白方名字（UTF-8）
+          落子序列：棋盘格数不超过256时每步1字节（i * 棋盘大小 + j），否则每步2字节（小端）
+      读取时使用内存映射逐局解析，可流式处理数百万局而不必全部载入内存；
+      另提供与SGF文本格式之间的互相转换。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+
+MAGIC = b"GBR1"
+
+# 对局结果
+RESULT_UNKNOWN = 0
+RESULT_BLACK = 1
+RESULT_WHITE = 2
+RESULT_DRAW = 3
+
+HEADER = struct.Struct("<HBBHHBB")
+
+# SGF 中的结果写法
+SGF_RESULTS = {RESULT_UNKNOWN: "?", RESULT_BLACK: "B+", RESULT_WHITE: "W+", RESULT_DRAW: "0"}
+
+
+class GameRecord:
+    """
+    一局棋谱：双方名字、结果、用时设置与落子序列 [(i, j), ...]，黑方先行
+    """
+    __slots__ = ("black", "white", "result", "size", "time_base", "time_increment", "moves")
+
+    def __init__(self, moves, size=15, result=RESULT_UNKNOWN, black="", white="", time_base=0, time_increment=0):
+        self.moves = moves
+        self.size = size
+        self.result = result
+        self.black = black
+        self.white = white
+        self.time_base = time_base
+        self.time_increment = time_increment
+
+    def __eq__(self, other):
+        return isinstance(other, GameRecord) and all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def __repr__(self):
+        return "GameRecord(%s vs %s, %dx%d, %d moves, result=%d)" % (
+            self.black or "?", self.white or "?", self.size, self.size, len(self.moves), self.result)
+
+
+def _move_width(size):
+    return 1 if size * size <= 256 else 2
+
+
+def _encode_name(name):
+    """
+    名字的UTF-8编码，超过255字节时在字符边界处截断
+    """
+    data = name.encode("utf-8")
+    if len(data) > 255:
+        data = data[:255].decode("utf-8", "ignore").encode("utf-8")
+    return data
+
+
+def encode_record(record):
+    """
+    将一局棋谱编码为字节串
+    """
+    black = _encode_name(record.black)
+    white = _encode_name(record.white)
+    size = record.size
+    codes = [i * size + j for i, j in record.moves]
+    if _move_width(size) == 1:
+        body = bytes(codes)
+    else:
+        body = struct.pack("<%dH" % len(codes), *codes)
+    header = HEADER.pack(len(codes), size, record.result, record.time_base, record.time_increment,
+                         len(black), len(white))
+    return header + black + white + body
+
+
+def decode_record(buffer, offset=0):
+    """
+    从 offset 处解码一局棋谱，返回 (棋谱, 下一局的偏移)
+    """
+    count, size, result, time_base, time_increment, black_len, white_len = HEADER.unpack_from(buffer, offset)
+    offset += HEADER.size
+    # 旧版本按字节截断的名字可能以不完整的字符结尾，解码时替换掉
+    black = bytes(buffer[offset:offset + black_len]).decode("utf-8", "replace")
+    offset += black_len
+    white = bytes(buffer[offset:offset + white_len]).decode("utf-8", "replace")
+    offset += white_len
+    if _move_width(size) == 1:
+        codes = buffer[offset:offset + count]
+        offset += count
+    else:
+        codes = struct.unpack_from("<%dH" % count, buffer, offset)
+        offset += 2 * count
+    moves = [divmod(code, size) for code in codes]
+    return GameRecord(moves, size, result, black, white, time_base, time_increment), offset
+
+
+class RecordWriter:
+    """
+    追加写入棋谱文件，可作为上下文管理器使用
+    """
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        if new_file:
+            self.file.write(MAGIC)
+        self.count = 0
+
+    def write(self, record):
+        self.file.write(encode_record(record))
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(path):
+    """
+    以内存映射方式逐局读取棋谱文件，内存占用与文件大小无关
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError("%s 不是棋谱文件" % path)
+            offset = len(MAGIC)
+            end = len(buffer)
+            while offset < end:
+                record, offset = decode_record(buffer, offset)
+                yield record
+
+
+def write_records(path, records):
+    """
+    把可迭代的棋谱逐局写入文件，返回写入局数
+    """
+    with RecordWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+        return writer.count
+
+
+def validate_moves(moves, size):
+    """
+    检查落子序列：每步须在棋盘内且不能落在已有棋子处，否则抛出 ValueError
+    """
+    seen = set()
+    for n, (i, j) in enumerate(moves, 1):
+        if not (0 <= i < size and 0 <= j < size):
+            raise ValueError("第 %d 步 (%d, %d) 不在 %dx%d 棋盘内" % (n, i, j, size, size))
+        if (i, j) in seen:
+            raise ValueError("第 %d 步 (%d, %d) 处已有棋子" % (n, i, j))
+        seen.add((i, j))
+
+
+def _sgf_point(i, j):
+    return chr(ord("a") + j) + chr(ord("a") + i)
+
+
+def _sgf_escape(text):
+    """
+    SGF 属性值中的反斜杠与 "]" 须以反斜杠转义，先转义反斜杠本身
+    """
+    return text.replace("\\", "\\\\").replace("]", "\\]")
+
+
+def to_sgf(record):
+    """
+    转换为SGF文本（GM[4] 为五子棋）
+    """
+    parts = ["(;GM[4]FF[4]SZ[%d]" % record.size]
+    if record.black:
+        parts.append("PB[%s]" % _sgf_escape(record.black))
+    if record.white:
+        parts.append("PW[%s]" % _sgf_escape(record.white))
+    parts.append("RE[%s]" % SGF_RESULTS[record.result])
+    if record.time_base or record.time_increment:
+        parts.append("TM[%d]OT[%d]" % (record.time_base, record.time_increment))
+    for n, (i, j) in enumerate(record.moves):
+        parts.append(";%s[%s]" % ("BW"[n % 2], _sgf_point(i, j)))
+    parts.append(")")
+    return "".join(parts)
+
+
+# SGF 记号：括号、分号，或属性值（属性名为空表示与前一个属性同名的后续值）
+_SGF_TOKEN = re.compile(r"[();]|([A-Za-z]*)\[((?:\\.|[^\]])*)\]")
+# 转义字符：反斜杠后的任意字符按原样保留
+_SGF_ESCAPE = re.compile(r"\\(.)", re.S)
+
+
+def from_sgf(text):
+    """
+    解析SGF文本，返回棋谱。只读取主分支（每个分叉处的第一个变化），读到第一个 ")" 即主分支结束；
+    落子必须黑白交替、在棋盘内且不重复，不含停着（B[]）或摆子（AB/AW），否则抛出 ValueError
+    """
+    props = {}
+    moves = []
+    key = None
+    for token in _SGF_TOKEN.finditer(text):
+        if token.group(0) == ")":
+            break
+        if token.group(0) in "(;":
+            continue
+        key = token.group(1) or key
+        value = _SGF_ESCAPE.sub(r"\1", token.group(2))
+        if key in ("B", "W"):
+            if len(value) != 2:
+                raise ValueError("SGF 第 %d 步为停着，不支持" % (len(moves) + 1))
+            if key != "BW"[len(moves) % 2]:
+                raise ValueError("SGF 第 %d 步应由%s方落子" % (len(moves) + 1, "黑白"[len(moves) % 2]))
+            moves.append((ord(value[1]) - ord("a"), ord(value[0]) - ord("a")))
+        elif key in ("AB", "AW", "AE"):
+            raise ValueError("SGF 含摆子（%s），不支持" % key)
+        else:
+            props.setdefault(key, value)
+    result = RESULT_UNKNOWN
+    re_value = props.get("RE", "?").upper()
+    if re_value.startswith("B"):
+        result = RESULT_BLACK
+    elif re_value.startswith("W"):
+        result = RESULT_WHITE
+    elif re_value in ("0", "DRAW", "JIGO"):
+        result = RESULT_DRAW
+    size = int(props.get("SZ", 15))
+    validate_moves(moves, size)
+    return GameRecord(moves, size, result, props.get("PB", ""), props.get("PW", ""),
+                      int(props.get("TM", 0) or 0), int(props.get("OT", 0) or 0))
+
+
+def to_renju_notation(record):
+    """
+    转换为连珠记谱法（列用字母 a-o，行从下往上 1-15），如 "h8 i9 g7"
+    """
+    return " ".join("%s%d" % (chr(ord("a") + j), record.size - i) for i, j in record.moves)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="五子棋棋谱工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("to-sgf", help="把二进制棋谱导出为SGF文件")
+    p.add_argument("records")
+    p.add_argument("out_dir")
+    p = sub.add_parser("from-sgf", help="把SGF文件追加到二进制棋谱")
+    p.add_argument("records")
+    p.add_argument("sgf_files", nargs="+")
+    p = sub.add_parser("stats", help="统计棋谱文件")
+    p.add_argument("records")
+    args = parser.parse_args()
+
+    if args.command == "to-sgf":
+        os.makedirs(args.out_dir, exist_ok=True)
+        for n, game in enumerate(iter_records(args.records)):
+            with open(os.path.join(args.out_dir, "%07d.sgf" % n), "w", encoding="utf-8") as out:
+                out.write(to_sgf(game))
+    elif args.command == "from-sgf":
+        def _load():
+            for name in args.sgf_files:
+                with open(name, encoding="utf-8") as sgf:
+                    yield from_sgf(sgf.read())
+        print("写入 %d 局" % write_records(args.records, _load()))
+    else:
+        games = moves = 0
+        results = [0, 0, 0, 0]
+        for game in iter_records(args.records):
+            games += 1
+            moves += len(game.moves)
+            results[game.result] += 1
+        print("共 %d 局，%d 步，黑胜 %d，白胜 %d，和棋 %d，未知 %d" % (
+            games, moves, results[RESULT_BLACK], results[RESULT_WHITE], results[RESULT_DRAW], results[RESULT_UNKNOWN]))
@@ -0,0 +1,230 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 自我对弈数据生成：多个进程并行让引擎自己和自己下棋，把每一步的
+      (局面, 搜索评分, 最佳位置, 对局结果) 流式写入分块文件，供调整 WEIGHTS 或训练估价网络使用
+      分块文件以 b"GSP1" 开头，之后是 <B 棋盘大小，随后每条样本为：
+          <HHib: 局面步数, 最佳位置编码, 搜索评分, 结果（对行棋方而言 1胜 / -1负 / 0和）
+          局面的落子序列（编码与 gobang_record 相同，黑方先行）
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import glob
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import time
+
+import gobang_engine as engine
+from gobang_pool import run_search
+from gobang_record import GameRecord, RecordWriter, RESULT_UNKNOWN, RESULT_BLACK, RESULT_WHITE, RESULT_DRAW
+
+MAGIC = b"GSP1"
+SAMPLE_HEADER = struct.Struct("<HHib")
+
+# 每个分块文件的样本数
+CHUNK_SIZE = 100000
+
+# 随机开局的步数与范围（距中心的最大距离）
+OPENING_MOVES = 3
+OPENING_RADIUS = 2
+
+SCORE_LIMIT = 2 ** 31 - 1
+
+
+class Sample:
+    """
+    一条训练样本：局面的落子序列、搜索评分（行棋方视角）、最佳位置与对局结果（行棋方视角）
+    """
+    __slots__ = ("moves", "score", "best_move", "result")
+
+    def __init__(self, moves, score, best_move, result):
+        self.moves = moves
+        self.score = score
+        self.best_move = best_move
+        self.result = result
+
+    def side_to_move(self):
+        return engine.BLACK if len(self.moves) % 2 == 0 else engine.WHITE
+
+    def position(self):
+        """
+        还原为引擎的 Position（真实颜色，黑方先行）
+        """
+        pos = engine.Position()
+        for n, (i, j) in enumerate(self.moves):
+            pos.play(engine.to_index(i, j), engine.BLACK if n % 2 == 0 else engine.WHITE)
+        return pos
+
+
+def engine_view(moves, to_move):
+    """
+    引擎总是以 AI_COLOR 行棋，把行棋方的棋子映射为 AI_COLOR、对方映射为 PLAYER_COLOR
+    """
+    stones = []
+    for n, (i, j) in enumerate(moves):
+        color = engine.BLACK if n % 2 == 0 else engine.WHITE
+        stones.append((i, j, engine.AI_COLOR if color == to_move else engine.PLAYER_COLOR))
+    return stones
+
+
+def play_game(job):
+    """
+    进行一局自我对弈，返回 (棋谱, 样本列表, 单线评分缓存统计)
+    缓存统计为本局的查询数、命中数，以及本工作进程缓存中不同线的数量
+    """
+    seed, size, depth, max_moves = job
+    if engine.BOARD_SIZE != size:
+        engine.set_board_size(size)
+    lookups, hits = engine.line_cache_stats["lookups"], engine.line_cache_stats["hits"]
+    rng = random.Random(seed)
+    center = size // 2
+    pos = engine.Position()
+    moves = []
+    while len(moves) < OPENING_MOVES:
+        i, j = center + rng.randint(-OPENING_RADIUS, OPENING_RADIUS), center + rng.randint(-OPENING_RADIUS,
+                                                                                            OPENING_RADIUS)
+        if (i, j) not in moves:
+            pos.play(engine.to_index(i, j), engine.BLACK if len(moves) % 2 == 0 else engine.WHITE)
+            moves.append((i, j))
+
+    searched = []
+    winner = None
+    while len(moves) < min(max_moves, size * size):
+        to_move = engine.BLACK if len(moves) % 2 == 0 else engine.WHITE
+        move, score, _, _ = run_search(engine_view(moves, to_move), depth)
+        if move is None:
+            break
+        searched.append((len(moves), to_move, max(-SCORE_LIMIT, min(SCORE_LIMIT, int(score))), move))
+        moves.append(move)
+        pos.play(engine.to_index(*move), to_move)
+        if pos.last_move_wins():
+            winner = to_move
+            break
+
+    samples = []
+    for count, to_move, score, move in searched:
+        result = 0 if winner is None else (1 if winner == to_move else -1)
+        samples.append(Sample(moves[:count], score, move, result))
+    if winner is None:
+        game_result = RESULT_DRAW if len(moves) >= size * size else RESULT_UNKNOWN
+    else:
+        game_result = RESULT_BLACK if winner == engine.BLACK else RESULT_WHITE
+    line_stats = (engine.line_cache_stats["lookups"] - lookups, engine.line_cache_stats["hits"] - hits,
+                  len(engine.line_cache))
+    return GameRecord(moves, size, game_result, "selfplay-d%d" % depth, "selfplay-d%d" % depth), samples, line_stats
+
+
+def encode_sample(sample, size):
+    width = "B" if size * size <= 256 else "H"
+    codes = [i * size + j for i, j in sample.moves]
+    best = sample.best_move[0] * size + sample.best_move[1]
+    return (SAMPLE_HEADER.pack(len(codes), best, sample.score, sample.result)
+            + struct.pack("<%d%s" % (len(codes), width), *codes))
+
+
+def chunk_writer(out_dir, size, chunk_size=CHUNK_SIZE, prefix="selfplay"):
+    """
+    基于生成器的分块写入器：通过 send() 逐条接收样本，写满 chunk_size 条后换下一个文件
+    只保留当前打开的文件，内存占用与样本总数无关；close() 时返回写入的样本总数
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    existing = len(glob.glob(os.path.join(out_dir, prefix + "_*.gsp")))
+    chunk_index = existing
+    written = 0
+    out = None
+    try:
+        while True:
+            sample = yield
+            if out is None or written % chunk_size == 0:
+                if out is not None:
+                    out.close()
+                out = open(os.path.join(out_dir, "%s_%05d.gsp" % (prefix, chunk_index)), "wb")
+                out.write(MAGIC + struct.pack("<B", size))
+                chunk_index += 1
+            out.write(encode_sample(sample, size))
+            written += 1
+    except GeneratorExit:
+        pass
+    finally:
+        if out is not None:
+            out.close()
+
+
+def iter_samples(path):
+    """
+    逐条读取分块文件中的样本；path 可以是单个文件或目录
+    """
+    paths = sorted(glob.glob(os.path.join(path, "*.gsp"))) if os.path.isdir(path) else [path]
+    for name in paths:
+        with open(name, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError("%s 不是自我对弈数据文件" % name)
+            size = buffer[len(MAGIC)]
+            width, step = ("B", 1) if size * size <= 256 else ("H", 2)
+            offset = len(MAGIC) + 1
+            end = len(buffer)
+            while offset < end:
+                count, best, score, result = SAMPLE_HEADER.unpack_from(buffer, offset)
+                offset += SAMPLE_HEADER.size
+                codes = struct.unpack_from("<%d%s" % (count, width), buffer, offset)
+                offset += count * step
+                yield Sample([divmod(code, size) for code in codes], score, divmod(best, size), result)
+
+
+def init_worker():
+    # 已证明局面只留在工作进程内存中，不读写文件
+    engine.PROVEN_AUTOSAVE = False
+
+
+def generate(out_dir, games, workers, size=engine.BOARD_SIZE, depth=2, max_moves=120, seed=0,
+             chunk_size=CHUNK_SIZE, games_path=None):
+    """
+    并行自我对弈 games 局，样本流式写入 out_dir；返回 (对局数, 样本数, 单线评分缓存统计)
+    缓存统计为 (查询数, 命中数, 单个工作进程缓存的最多不同线数)
+    """
+    jobs = ((seed + n, size, depth, max_moves) for n in range(games))
+    writer = chunk_writer(out_dir, size, chunk_size)
+    next(writer)
+    records = RecordWriter(games_path) if games_path else None
+    played = samples = 0
+    lookups = hits = unique = 0
+    try:
+        with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+            for record, game_samples, (game_lookups, game_hits, cached) in pool.imap_unordered(play_game, jobs):
+                for sample in game_samples:
+                    writer.send(sample)
+                played += 1
+                samples += len(game_samples)
+                lookups += game_lookups
+                hits += game_hits
+                unique = max(unique, cached)
+                if records is not None:
+                    records.write(record)
+    finally:
+        writer.close()
+        if records is not None:
+            records.close()
+    return played, samples, (lookups, hits, unique)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="五子棋自我对弈数据生成")
+    parser.add_argument("out_dir", help="分块样本文件的输出目录")
+    parser.add_argument("--games", type=int, default=100, help="对局数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="并行进程数")
+    parser.add_argument("--size", type=int, default=15, choices=engine.SUPPORTED_BOARD_SIZES, help="棋盘大小")
+    parser.add_argument("--depth", type=int, default=2, help="搜索深度")
+    parser.add_argument("--max-moves", type=int, default=120, help="每局最多步数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="每个分块文件的样本数")
+    parser.add_argument("--record", metavar="PATH", help="同时把完整对局追加到二进制棋谱文件")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    played, total, (lookups, hits, unique) = generate(args.out_dir, args.games, args.workers, args.size, args.depth,
+                                                      args.max_moves, args.seed, args.chunk_size, args.record)
+    print("完成 %d 局，%d 条样本，用时 %.1f s" % (played, total, time.perf_counter() - start))
+    print("单线评分缓存: 查询 %d 次，命中 %d 次（%.1f%%），单个进程最多缓存 %d 条不同的线" % (
+        lookups, hits, 100.0 * hits / max(lookups, 1), unique))
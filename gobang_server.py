@@ -0,0 +1,323 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 五子棋多局对战服务器：基于asyncio的行协议TCP服务，同时托管多局人机对弈，
+      AI搜索交给有界进程池执行，事件循环不会被阻塞
+GitHub: RyanZzzzq
+
+协议（每行一条命令，UTF-8文本）：
+    客户端 -> 服务器:  MOVE i j | NEW | STATS | QUIT
+    服务器 -> 客户端:  READY game_id size budget | MOVE i j score | WIN PLAYER | WIN AI i j
+                      | BUSY | ERROR 说明 | STATS {json}
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+import gobang_engine as engine
+from gobang_pool import EnginePool
+
+# 每局AI的默认思考时间预算（秒）：每步最多用剩余预算的 MOVE_TIME_FRACTION，另按剩余比例降低搜索深度
+DEFAULT_TIME_BUDGET = 120.0
+MOVE_TIME_FRACTION = 0.1
+
+# 剩余预算低于该比例时降低一层搜索深度（迭代加深受每步时间上限约束，预算越少完成的层数自然越少）
+LOW_BUDGET_RATIO = 0.3
+
+
+class PoolBusy(Exception):
+    """
+    等待队列已满时抛出，服务器据此向客户端返回 BUSY
+    """
+
+
+class SearchPool:
+    """
+    有界搜索进程池：同时提交给引擎进程池的搜索不超过 工作进程数 x 批大小，其余请求在等待队列中排队；
+    队列超过上限时直接拒绝（背压），并记录用于确定进程池大小的指标
+    """
+
+    def __init__(self, workers, queue_limit, board_size):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.engines = EnginePool(workers, board_size)
+        self.slots = asyncio.Semaphore(workers * self.engines.batch_size)
+        self.metrics = {
+            "searches": 0,
+            "rejected": 0,
+            "queued": 0,
+            "max_queued": 0,
+            "in_flight": 0,
+            "queue_wait_total": 0.0,
+            "search_time_total": 0.0,
+            "nodes_total": 0,
+        }
+
+    async def search(self, game_id, stones, depth, seconds=None):
+        metrics = self.metrics
+        if metrics["queued"] >= self.queue_limit:
+            metrics["rejected"] += 1
+            raise PoolBusy()
+        loop = asyncio.get_running_loop()
+        enqueued = loop.time()
+        metrics["queued"] += 1
+        metrics["max_queued"] = max(metrics["max_queued"], metrics["queued"])
+        try:
+            await self.slots.acquire()
+        finally:
+            metrics["queued"] -= 1
+        metrics["queue_wait_total"] += loop.time() - enqueued
+        metrics["in_flight"] += 1
+        try:
+            move, score, nodes, elapsed = await asyncio.wrap_future(self.engines.submit(game_id, stones, depth, seconds))
+        finally:
+            metrics["in_flight"] -= 1
+            self.slots.release()
+        metrics["searches"] += 1
+        metrics["search_time_total"] += elapsed
+        metrics["nodes_total"] += nodes
+        return move, score, elapsed
+
+    def snapshot(self):
+        """
+        返回当前指标及平均排队、搜索时间
+        """
+        metrics = dict(self.metrics)
+        done = max(metrics["searches"], 1)
+        metrics["workers"] = self.workers
+        metrics["queue_limit"] = self.queue_limit
+        metrics["avg_queue_wait"] = metrics["queue_wait_total"] / done
+        metrics["avg_search_time"] = metrics["search_time_total"] / done
+        metrics["engine_workers"] = self.engines.latency_percentiles()
+        return metrics
+
+    def release(self, game_id):
+        self.engines.release(game_id)
+
+    def shutdown(self):
+        self.engines.close()
+
+
+class Game:
+    """
+    单局对弈状态：引擎局面、落子记录与AI已用时间
+    """
+    __slots__ = ("game_id", "board_size", "position", "stones", "time_budget", "time_used", "finished", "level")
+
+    def __init__(self, game_id, board_size, time_budget, level=None):
+        self.game_id = game_id
+        self.board_size = board_size
+        self.time_budget = time_budget
+        self.level = level
+        self.reset()
+
+    def reset(self):
+        self.position = engine.Position()
+        self.stones = []
+        self.time_used = 0.0
+        self.finished = False
+
+    def is_legal(self, i, j):
+        return 0 <= i < self.board_size and 0 <= j < self.board_size and \
+            self.position.cells[engine.to_index(i, j)] == engine.EMPTY
+
+    def play(self, i, j, color):
+        self.position.play(engine.to_index(i, j), color)
+        self.stones.append((i, j, color))
+
+    def undo(self):
+        self.position.undo()
+        self.stones.pop()
+
+    def is_win(self, i, j):
+        """
+        判断 (i, j) 处的落子是否形成五连
+        """
+        return self.position.is_win_at(engine.to_index(i, j))
+
+    def search_depth(self):
+        """
+        根据剩余时间预算选择搜索深度，预算不足时降低深度以保证每局总耗时可控；
+        指定了难度等级时直接返回等级名，每步的搜索量由该等级的节点预算限定
+        """
+        if self.level is not None:
+            return self.level
+        remaining = (self.time_budget - self.time_used) / self.time_budget
+        if remaining <= LOW_BUDGET_RATIO:
+            return max(1, engine.MAX_DEPTH - 1)
+        return engine.MAX_DEPTH
+
+    def move_time(self):
+        """
+        本步搜索的时间上限：剩余AI思考时间的 MOVE_TIME_FRACTION，为之后的各步留出时间；
+        预算用完后每步只做深度0的搜索（通常只需几毫秒）
+        """
+        return max(self.time_budget - self.time_used, 0.0) * MOVE_TIME_FRACTION
+
+
+class GameServer:
+    """
+    行协议五子棋服务器，每个连接对应一局游戏
+    """
+
+    def __init__(self, pool, board_size, time_budget, level=None):
+        self.pool = pool
+        self.board_size = board_size
+        self.time_budget = time_budget
+        self.level = level
+        self.game_ids = itertools.count(1)
+        self.games = {}
+        self.games_total = 0
+
+    def stats(self):
+        metrics = self.pool.snapshot()
+        metrics["games_active"] = len(self.games)
+        metrics["games_total"] = self.games_total
+        return metrics
+
+    async def handle_client(self, reader, writer):
+        game = Game(next(self.game_ids), self.board_size, self.time_budget, self.level)
+        self.games[game.game_id] = game
+        self.games_total += 1
+
+        def send(line):
+            writer.write((line + "\n").encode("utf-8"))
+
+        send("READY %d %d %g" % (game.game_id, game.board_size, game.time_budget))
+        try:
+            while True:
+                await writer.drain()
+                raw = await reader.readline()
+                if not raw:
+                    break
+                parts = raw.decode("utf-8", "replace").split()
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                if command == "QUIT":
+                    break
+                elif command == "NEW":
+                    self.pool.release(game.game_id)
+                    game.reset()
+                    send("READY %d %d %g" % (game.game_id, game.board_size, game.time_budget))
+                elif command == "STATS":
+                    send("STATS " + json.dumps(self.stats()))
+                elif command == "MOVE":
+                    await self.handle_move(game, parts[1:], send)
+                else:
+                    send("ERROR 未知命令 %s" % command)
+        finally:
+            del self.games[game.game_id]
+            self.pool.release(game.game_id)
+            writer.close()
+
+    async def handle_move(self, game, args, send):
+        try:
+            i, j = int(args[0]), int(args[1])
+        except (IndexError, ValueError):
+            send("ERROR 格式应为 MOVE i j")
+            return
+        if game.finished:
+            send("ERROR 对局已结束，发送 NEW 重新开始")
+            return
+        if not game.is_legal(i, j):
+            send("ERROR 非法落子 %d %d" % (i, j))
+            return
+        game.play(i, j, engine.PLAYER_COLOR)
+        if game.is_win(i, j):
+            game.finished = True
+            send("WIN PLAYER")
+            return
+        try:
+            move, score, elapsed = await self.pool.search(game.game_id, list(game.stones),
+                                                           game.search_depth(), game.move_time())
+        except PoolBusy:
+            # 撤回玩家落子，客户端稍后重试
+            game.undo()
+            send("BUSY")
+            return
+        game.time_used += elapsed
+        if move is None:
+            send("ERROR 没有可落子的位置")
+            return
+        game.play(move[0], move[1], engine.AI_COLOR)
+        if game.is_win(*move):
+            game.finished = True
+            send("WIN AI %d %d" % move)
+        else:
+            send("MOVE %d %d %s" % (move[0], move[1], score))
+
+
+async def run_demo_client(host, port, moves, seed):
+    """
+    本地测试客户端：随机在AI落子附近落子，返回收到的响应数
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    ready = (await reader.readline()).decode().split()
+    size = int(ready[2])
+    occupied = set()
+    last = (size // 2, size // 2)
+    replies = 0
+    for _ in range(moves):
+        while True:
+            i = min(max(last[0] + rng.randint(-2, 2), 0), size - 1)
+            j = min(max(last[1] + rng.randint(-2, 2), 0), size - 1)
+            if (i, j) not in occupied:
+                break
+        writer.write(("MOVE %d %d\n" % (i, j)).encode())
+        await writer.drain()
+        reply = (await reader.readline()).decode().split()
+        replies += 1
+        if reply[0] == "BUSY":
+            await asyncio.sleep(0.05)
+            continue
+        occupied.add((i, j))
+        if reply[0] == "WIN":
+            break
+        if reply[0] == "MOVE":
+            last = (int(reply[1]), int(reply[2]))
+            occupied.add(last)
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+    return replies
+
+
+async def main(args):
+    engine.set_board_size(args.size)
+    pool = SearchPool(args.workers, args.queue_limit, args.size)
+    game_server = GameServer(pool, args.size, args.budget, args.level)
+    server = await asyncio.start_server(game_server.handle_client, args.host, args.port)
+    port = server.sockets[0].getsockname()[1]
+    print("五子棋服务器已启动: %s:%d（%d 个搜索进程，队列上限 %d）" % (args.host, port, args.workers, args.queue_limit))
+    try:
+        async with server:
+            if args.demo:
+                start = time.perf_counter()
+                await asyncio.gather(*(run_demo_client(args.host, port, args.demo_moves, seed)
+                                       for seed in range(args.demo)))
+                print("%d 个本地客户端完成，用时 %.2f s" % (args.demo, time.perf_counter() - start))
+                print(json.dumps(game_server.stats(), indent=2, ensure_ascii=False))
+            else:
+                await server.serve_forever()
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="五子棋多局对战服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口，0表示随机端口")
+    parser.add_argument("--size", type=int, default=15, choices=engine.SUPPORTED_BOARD_SIZES, help="棋盘大小")
+    parser.add_argument("--workers", type=int, default=4, help="搜索进程数")
+    parser.add_argument("--queue-limit", type=int, default=64, help="等待队列上限，超过时返回 BUSY")
+    parser.add_argument("--budget", type=float, default=DEFAULT_TIME_BUDGET, help="每局AI思考时间预算（秒）")
+    parser.add_argument("--level", choices=list(engine.DIFFICULTY_LEVELS),
+                        help="难度等级：每步按固定的节点预算搜索（不指定时按剩余时间预算选择搜索深度）")
+    parser.add_argument("--demo", type=int, default=0, help="启动若干本地测试客户端并输出指标")
+    parser.add_argument("--demo-moves", type=int, default=8, help="每个测试客户端的落子数")
+    asyncio.run(main(parser.parse_args()))
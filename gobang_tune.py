@@ -0,0 +1,157 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 棋形权重 WEIGHTS 的自动调参（Texel 方法）
+      1. 多进程并行地从自我对弈样本中提取棋形特征（行棋方棋形数 - 对方棋形数）；
+      2. 用 sigmoid(K * 评分) 拟合对局结果，先确定缩放系数 K，再对各权重做乘性局部搜索，
+         所有候选权重的误差一次矩阵运算算出；
+      3. 每轮结束写检查点，可中断后继续；结果写入引擎启动时读取的权重文件。
+GitHub: RyanZzzzq
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import gobang_engine as engine
+from gobang_selfplay import iter_samples
+
+# 参与调参的棋形；五连只在终局出现，保持原值作为胜负标记
+TUNED_PATTERNS = ("open_four", "open_three", "open_two")
+
+# 每个特征提取任务处理的样本数
+EXTRACT_BATCH = 2000
+
+
+def extract_features(job):
+    """
+    计算一批样本的特征矩阵（列顺序同 engine.PATTERNS）与目标值（行棋方得分：胜1 / 和0.5 / 负0）
+    """
+    size, batch = job
+    if engine.BOARD_SIZE != size:
+        engine.set_board_size(size)
+    features = np.zeros((len(batch), len(engine.PATTERNS)))
+    targets = np.zeros(len(batch))
+    for n, (moves, result) in enumerate(batch):
+        pos = engine.Position()
+        for k, (i, j) in enumerate(moves):
+            pos.play(engine.to_index(i, j), engine.BLACK if k % 2 == 0 else engine.WHITE)
+        mover = engine.BLACK if len(moves) % 2 == 0 else engine.WHITE
+        opponent = engine.WHITE if mover == engine.BLACK else engine.BLACK
+        features[n] = np.subtract(engine.pattern_counts(pos, mover), engine.pattern_counts(pos, opponent))
+        targets[n] = (result + 1) / 2
+    return features, targets
+
+
+def load_dataset(path, size, workers, limit=None):
+    """
+    并行提取样本特征，返回 (特征矩阵, 目标值)
+    """
+    samples = ((s.moves, s.result) for s in itertools.islice(iter_samples(path), limit))
+
+    def jobs():
+        while True:
+            batch = list(itertools.islice(samples, EXTRACT_BATCH))
+            if not batch:
+                return
+            yield size, batch
+
+    parts = []
+    with multiprocessing.Pool(workers) as pool:
+        parts.extend(pool.imap(extract_features, jobs()))
+    if not parts:
+        raise ValueError("%s 中没有样本" % path)
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def errors(features, targets, candidates, k):
+    """
+    一次计算多组候选权重的均方误差，candidates 形状为 (候选数, 棋形数)
+    """
+    scores = features @ candidates.T
+    predicted = 1.0 / (1.0 + np.exp(-np.clip(k * scores, -50, 50)))
+    return ((predicted - targets[:, None]) ** 2).mean(axis=0)
+
+
+def fit_scale(features, targets, weights):
+    """
+    在对数网格上寻找使误差最小的缩放系数 K
+    """
+    grid = np.logspace(-8, -1, 141)
+    errs = [errors(features, targets, weights[None, :], k)[0] for k in grid]
+    return float(grid[int(np.argmin(errs))])
+
+
+def tune(features, targets, state, checkpoint, max_passes, min_step):
+    """
+    乘性局部搜索：每轮对每个参与调参的权重尝试放大和缩小 step 倍，接受能降低误差的改动；
+    一轮没有改进时步长减半
+    """
+    names = engine.PATTERNS
+    weights = np.array([state["weights"][name] for name in names], dtype=float)
+    tuned = [names.index(name) for name in TUNED_PATTERNS]
+    best = errors(features, targets, weights[None, :], state["k"])[0]
+    while state["pass"] < max_passes and state["step"] >= min_step:
+        improved = False
+        for col in tuned:
+            candidates = np.repeat(weights[None, :], 2, axis=0)
+            candidates[0, col] *= 1 + state["step"]
+            candidates[1, col] /= 1 + state["step"]
+            errs = errors(features, targets, candidates, state["k"])
+            choice = int(np.argmin(errs))
+            if errs[choice] < best:
+                best = errs[choice]
+                weights = candidates[choice]
+                improved = True
+        if not improved:
+            state["step"] /= 2
+        state["pass"] += 1
+        state["error"] = float(best)
+        state["weights"] = {name: float(w) for name, w in zip(names, weights)}
+        with open(checkpoint, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        print("第 %d 轮  误差 %.6f  步长 %.4f  %s" % (
+            state["pass"], best, state["step"],
+            "  ".join("%s=%d" % (name, state["weights"][name]) for name in TUNED_PATTERNS)))
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用自我对弈样本调整棋形权重（Texel 方法）")
+    parser.add_argument("samples", help="自我对弈样本文件或目录（gobang_selfplay.py 的输出）")
+    parser.add_argument("--size", type=int, default=15, choices=engine.SUPPORTED_BOARD_SIZES, help="棋盘大小")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="特征提取进程数")
+    parser.add_argument("--limit", type=int, help="最多使用的样本数")
+    parser.add_argument("--passes", type=int, default=50, help="最多搜索轮数")
+    parser.add_argument("--step", type=float, default=0.5, help="初始乘性步长")
+    parser.add_argument("--min-step", type=float, default=0.01, help="步长小于该值时停止")
+    parser.add_argument("--checkpoint", default="tune_checkpoint.json", help="检查点文件，存在时从中继续")
+    parser.add_argument("--output", default=engine.WEIGHTS_FILE, help="输出的权重文件")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    features, targets = load_dataset(args.samples, args.size, args.workers, args.limit)
+    print("提取 %d 条样本特征，用时 %.1f s" % (len(targets), time.perf_counter() - start))
+
+    if os.path.exists(args.checkpoint):
+        with open(args.checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+        print("从检查点继续：第 %d 轮" % state["pass"])
+    else:
+        state = {"weights": {name: float(engine.WEIGHTS[name]) for name in engine.PATTERNS},
+                 "step": args.step, "pass": 0}
+        initial = np.array([state["weights"][name] for name in engine.PATTERNS])
+        state["k"] = fit_scale(features, targets, initial)
+        state["error"] = float(errors(features, targets, initial[None, :], state["k"])[0])
+        print("缩放系数 K = %g，初始误差 %.6f" % (state["k"], state["error"]))
+
+    state = tune(features, targets, state, args.checkpoint, args.passes, args.min_step)
+    output = dict(engine.WEIGHTS)
+    output.update({name: int(round(w)) for name, w in state["weights"].items()})
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print("权重已写入 %s" % args.output)
@@ -0,0 +1,21 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 批量复盘测试：按节点预算分析时每步的节点数不超过预算
+GitHub: RyanZzzzq
+"""
+
+import gobang_engine as engine
+from gobang_analyse import analyse_game
+
+MOVES = [(7, 7), (7, 8), (8, 8), (6, 6), (9, 9), (8, 7), (6, 8)]
+
+
+def test_node_budget_is_exact():
+    engine.set_board_size(15)
+    budget = 1500
+    _, lines = analyse_game((0, "test", 0, 15, MOVES, 0, engine.BUDGET_MAX_DEPTH, budget))
+    moves = [line for line in lines if line["type"] == "move"]
+    assert moves and all(line["nodes"] <= budget for line in moves)
+    # 迭代加深到不了最大深度，每步都用满预算
+    assert all(line["nodes"] == budget for line in moves)
+    assert lines[-1]["type"] == "game"
@@ -0,0 +1,172 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 引擎测试：战术局面应着、落子栈增量维护的一致性、节点预算搜索的确定性、两个后端结果一致
+GitHub: RyanZzzzq
+"""
+
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import gobang_engine as engine
+from gobang_bench import TACTICAL_POSITIONS, check_move_stack, corpus, run_corpus, tactical_board
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    engine.set_board_size(15)
+    engine.ensure_tables()
+    engine.clear_search_state()
+    yield
+    engine.clear_search_state()
+
+
+@pytest.mark.parametrize("name, blacks, whites, answers", TACTICAL_POSITIONS, ids=[p[0] for p in TACTICAL_POSITIONS])
+def test_tactical_answer(name, blacks, whites, answers):
+    move, _ = engine.search_move(tactical_board(blacks, whites))
+    assert move in answers
+
+
+@pytest.mark.parametrize("level", list(engine.DIFFICULTY_LEVELS)[:2])
+def test_tactical_answer_with_budget(level):
+    for _, blacks, whites, answers in TACTICAL_POSITIONS:
+        move, _ = engine.search_with_budget(tactical_board(blacks, whites), **engine.DIFFICULTY_LEVELS[level])
+        assert move in answers
+
+
+def test_hard_level_stops_on_node_budget():
+    # 等级没有时间上限：hard 在“AI堵4”上用满整个节点预算，而不是被时钟提前截断
+    _, blacks, whites, answers = TACTICAL_POSITIONS[0]
+    budget = engine.DIFFICULTY_LEVELS["hard"]["nodes"]
+    nodes_before = engine.search_stats["nodes"]
+    with engine.search_settings(DIFFICULTY="hard"):
+        move, _ = engine.search_move(tactical_board(blacks, whites))
+    assert move in answers
+    assert engine.search_stats["nodes"] - nodes_before == engine.budget_stats["nodes"] == budget
+    assert engine.budget_stats["aborted"]
+
+
+def test_transposition_table_keeps_sides_apart():
+    # “AI堵4”：AI行棋时挡住即可，轮到玩家时玩家直接成五；AI行棋的结果不能被玩家行棋时复用
+    pos = engine.Position.from_array(tactical_board(*TACTICAL_POSITIONS[0][1:3]))
+    _, score = engine.search_best_move(pos)
+    assert score > -engine.WIN_THRESHOLD
+    engine.root_ply[0] = len(pos.stack)
+    engine.quiescence_budget[0] = engine.QUIESCENCE_NODE_LIMIT
+    assert engine.alpha_beta_search(pos, 1, float('-inf'), float('inf'), False) <= -engine.WIN_THRESHOLD
+
+
+def test_move_stack_consistent():
+    assert check_move_stack(operations=1000) == (1000, 0)
+
+
+def test_move_stack_consistent_with_accumulator():
+    pytest.importorskip("numpy")
+    assert check_move_stack(operations=300, seed=1, with_accumulator=True) == (300, 0)
+
+
+def test_budget_search_ignores_earlier_searches():
+    board = tactical_board(*TACTICAL_POSITIONS[1][1:3])
+    fresh = engine.search_with_budget(board, nodes=3000), engine.budget_stats["nodes"]
+    # 其他局面的搜索会留下置换表、历史启发与已证明局面
+    for _, blacks, whites, _ in TACTICAL_POSITIONS:
+        engine.search_best_move(tactical_board(blacks, whites))
+    assert (engine.search_with_budget(board, nodes=3000), engine.budget_stats["nodes"]) == fresh
+
+
+def test_python_and_numba_backends_agree():
+    pytest.importorskip("numba")
+    boards = corpus(count=4)
+    try:
+        with engine.search_settings(MAX_DEPTH=1):
+            python_results, python_nodes, _ = run_corpus("python", boards)
+            numba_results, numba_nodes, _ = run_corpus("numba", boards)
+    finally:
+        engine.set_backend("python")
+    assert numba_results == python_results
+    assert numba_nodes == python_nodes
+
+
+def test_numba_backend_from_environment():
+    # 环境变量指定的后端在建表时才加载，直接运行引擎模块时不会与 gobang_jit 循环导入
+    pytest.importorskip("numba")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, GOBANG_BACKEND="numba")
+    code = "import gobang_engine as e; e.ensure_tables(); print(e.BACKEND)"
+    outputs = []
+    for args in (["-c", code], ["gobang_engine.py"]):
+        result = subprocess.run([sys.executable] + args, cwd=root, env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        outputs.append(result.stdout)
+    assert outputs[0].strip() == "numba"
+
+
+def test_goto_matches_rebuilt_position():
+    # 悔棋、重做与载入都经 Position.goto 跳转：任意两个落子序列之间来回跳转后与从头重建的局面一致
+    rng = random.Random(0)
+    sequences = [[engine.to_index(i, j) for i, j in rng.sample(
+        [(i, j) for i in range(15) for j in range(15)], rng.randrange(0, 40))] for _ in range(20)]
+    # 让部分序列共享前缀，覆盖只撤销尾部的情况
+    sequences += [seq[:len(seq) // 2] for seq in sequences[:5]]
+    pos = engine.Position()
+    for seq in sequences + sequences[::-1]:
+        moves = [(idx, engine.BLACK if n % 2 == 0 else engine.WHITE) for n, idx in enumerate(seq)]
+        pos.goto(moves)
+        assert pos.check_consistency(moves) == []
+
+
+@pytest.mark.parametrize("t", range(1, 8))
+def test_symmetry_cache_maps_move_back(t):
+    # 8种对称变换下的同一开局共用一条缓存：变换后的局面命中缓存，给出的位置是原最佳位置的像
+    stones = [((7, 7), engine.BLACK), ((7, 8), engine.WHITE), ((9, 6), engine.BLACK)]
+    pos = engine.Position()
+    image = engine.Position()
+    for (i, j), color in stones:
+        pos.play(engine.to_index(i, j), color)
+        image.play(engine.SYMMETRY_MAPS[t][engine.to_index(i, j)], color)
+    assert engine.canonical_hash(pos)[0] == engine.canonical_hash(image)[0]
+    move, score = engine.search_best_move(pos)
+    engine.transposition_table.clear()
+    hits = engine.symmetry_stats["hits"]
+    image_move, image_score = engine.search_best_move(image)
+    assert engine.symmetry_stats["hits"] == hits + 1
+    assert engine.to_index(*image_move) == engine.SYMMETRY_MAPS[t][engine.to_index(*move)]
+    assert image_score == score
+
+
+def position_of(blacks, whites):
+    return engine.Position.from_array(tactical_board(blacks, whites))
+
+
+def indices(points):
+    return sorted(engine.to_index(i, j) for i, j in points)
+
+
+def test_threat_moves_forced_replies():
+    # 对方冲四：只能挡
+    _, blacks, whites, answers = TACTICAL_POSITIONS[0]
+    assert engine.threat_moves(position_of(blacks, whites), engine.WHITE) == indices(answers)
+    # 己方能成五：只走成五的位置，先于挡对方的四
+    pos = position_of(blacks, whites + [(3, 3), (3, 4), (3, 5), (3, 6)])
+    assert engine.threat_moves(pos, engine.WHITE) in (indices([(3, 2)]), indices([(3, 7)]))
+    # 对方活三：活三窗口内的空位加上己方成四的反击位置
+    pos = position_of([(7, 6), (7, 7), (7, 8)], [(3, 3), (3, 4), (3, 5)])
+    forced = engine.threat_moves(pos, engine.WHITE)
+    assert set(indices([(7, 5), (7, 9)])) <= set(forced)
+    assert set(indices([(3, 2), (3, 6)])) <= set(forced)
+    assert engine.threat_moves(pos, engine.WHITE, open_threes=False) is None
+    # 没有威胁
+    assert engine.threat_moves(position_of([(7, 7)], [(7, 8)]), engine.WHITE) is None
+
+
+@pytest.mark.parametrize("name, blacks, whites, answers", TACTICAL_POSITIONS, ids=[p[0] for p in TACTICAL_POSITIONS])
+def test_threat_pruning_keeps_score(name, blacks, whites, answers):
+    # 威胁剪枝只去掉不应对威胁的位置：定深搜索的评分与不剪枝时相同
+    _, pruned = engine.search_move(tactical_board(blacks, whites))
+    engine.clear_search_state()
+    with engine.search_settings(THREAT_PRUNING=False):
+        _, full = engine.search_move(tactical_board(blacks, whites))
+    assert pruned == full
@@ -0,0 +1,83 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 估价缓存测试：命中与淘汰后的评分与不用缓存时一致；单线评分缓存与逐窗口统计一致
+GitHub: RyanZzzzq
+"""
+
+import random
+
+import pytest
+
+import gobang_engine as engine
+from gobang_engine import search_settings
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    engine.set_board_size(15)
+    engine.ensure_tables()
+    engine.clear_search_state()
+    engine.line_cache.clear()
+    for stats in (engine.eval_cache_stats, engine.line_cache_stats):
+        for key in stats:
+            stats[key] = 0
+    yield
+    engine.clear_search_state()
+
+
+def random_positions(count, seed=0):
+    rng = random.Random(seed)
+    cells = [engine.to_index(i, j) for i in range(3, 12) for j in range(3, 12)]
+    positions = []
+    for _ in range(count):
+        pos = engine.Position()
+        for n, idx in enumerate(rng.sample(cells, rng.randrange(1, 30))):
+            pos.play(idx, engine.BLACK if n % 2 == 0 else engine.WHITE)
+        positions.append(pos)
+    return positions
+
+
+def uncached_score(pos):
+    with search_settings(EVAL_CACHE=False):
+        return engine.static_score(pos)
+
+
+def test_eval_cache_hits_match_uncached():
+    positions = random_positions(200)
+    expected = [uncached_score(pos) for pos in positions]
+    for _ in range(2):
+        assert [engine.static_score(pos) for pos in positions] == expected
+    assert engine.eval_cache_stats["hits"] >= len(positions)
+
+
+def test_eval_cache_eviction_keeps_scores():
+    # 只有 2 个桶、每桶 2 个槽：几乎每次写入都要淘汰
+    with search_settings(EVAL_CACHE_BUCKETS=2, EVAL_CACHE_WAYS=2):
+        engine.clear_eval_cache()
+        positions = random_positions(100, seed=1)
+        for pos in positions + positions[::-1]:
+            assert engine.static_score(pos) == uncached_score(pos)
+        assert engine.eval_cache_stats["evictions"] > 0
+    engine.clear_eval_cache()
+
+
+def pattern_score(pos, color):
+    return sum(engine.WEIGHTS[name] * n for name, n in zip(engine.PATTERNS, engine.pattern_counts(pos, color)))
+
+
+def test_line_cache_matches_window_counts():
+    positions = random_positions(200, seed=2)
+    for _ in range(2):
+        for pos in positions:
+            scores = engine.evaluate_both(pos)
+            assert scores[engine.BLACK] == pattern_score(pos, engine.BLACK)
+            assert scores[engine.WHITE] == pattern_score(pos, engine.WHITE)
+    assert engine.line_cache_stats["hits"] > 0
+
+
+def test_line_cache_refills_when_full():
+    # 表满时清空重建，评分不受影响
+    with search_settings(LINE_CACHE_MAX_SIZE=8):
+        for pos in random_positions(50, seed=3):
+            assert engine.evaluate_both(pos)[engine.BLACK] == pattern_score(pos, engine.BLACK)
+            assert len(engine.line_cache) <= 8 + len(engine.LINES)
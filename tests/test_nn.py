@@ -0,0 +1,38 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 神经网络估价测试：启用后搜索可用，改变棋盘大小后不再使用按旧大小构建的模型
+GitHub: RyanZzzzq
+"""
+
+import pytest
+
+import gobang_engine as engine
+from gobang_bench import TACTICAL_POSITIONS, tactical_board
+
+gobang_nn = pytest.importorskip("gobang_nn")
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    engine.set_board_size(15)
+    path = str(tmp_path / "model.npz")
+    gobang_nn.NNModel.random().save(path)
+    yield path
+    engine.set_nn_evaluator(None)
+    engine.set_board_size(15)
+
+
+def test_board_size_change_drops_model(model_path):
+    engine.set_nn_evaluator(model_path)
+    _, blacks, whites, _ = TACTICAL_POSITIONS[0]
+    assert engine.search_best_move(tactical_board(blacks, whites))[0] is not None
+    engine.set_board_size(19)
+    assert engine.nn_model is None
+    # 19路上照常搜索（使用棋形估价），不会用到15路的窗口编号
+    board = [[engine.EMPTY] * 19 for _ in range(19)]
+    board[18][18] = engine.PLAYER_COLOR
+    assert engine.search_best_move(board)[0] is not None
+    # 重新启用后按新大小构建
+    engine.set_nn_evaluator(model_path)
+    assert len(engine.nn_model.cell_windows) == len(engine.CELL_WINDOWS)
+    assert engine.search_best_move(board)[0] is not None
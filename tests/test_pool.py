@@ -0,0 +1,56 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 引擎进程池测试：对局绑定工作进程、结果正确、释放对局与延迟统计
+GitHub: RyanZzzzq
+"""
+
+import pytest
+
+import gobang_engine as engine
+import gobang_pool
+from gobang_bench import TACTICAL_POSITIONS
+
+
+def stones_of(blacks, whites):
+    return [(i, j, engine.BLACK) for i, j in blacks] + [(i, j, engine.WHITE) for i, j in whites]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # 只预热中心一个开局，缩短工作进程启动时间（工作进程以 fork 启动，继承该设置）
+    monkeypatch.setattr(gobang_pool, "OPENING_RADIUS", 0)
+    engine.set_board_size(15)
+    pool = gobang_pool.EnginePool(2, 15)
+    yield pool
+    pool.close()
+
+
+def test_run_search_answers_tactics():
+    engine.ensure_tables()
+    for _, blacks, whites, answers in TACTICAL_POSITIONS:
+        move, _, nodes, _ = gobang_pool.run_search(stones_of(blacks, whites), engine.MAX_DEPTH)
+        assert move in answers and nodes > 0
+
+
+def test_pool_keeps_games_on_one_worker(pool):
+    futures = []
+    for game_id, (_, blacks, whites, answers) in enumerate(TACTICAL_POSITIONS):
+        futures.append((pool.submit(game_id, stones_of(blacks, whites), "easy"), answers))
+        futures.append((pool.submit(game_id, stones_of(blacks, whites), 1), answers))
+    for future, answers in futures:
+        assert future.result(timeout=120)[0] in answers
+    # 新对局分配给对局数最少的进程，每局的两次请求都在同一进程上完成
+    assert sorted(pool.games_on_worker) == [2, 2]
+    report = pool.latency_percentiles()
+    for worker in range(2):
+        games = [g for g, w in pool.affinity.items() if w == worker]
+        assert report[worker]["requests"] == 2 * len(games)
+    for game_id in range(len(TACTICAL_POSITIONS)):
+        pool.release(game_id)
+    assert pool.games_on_worker == [0, 0] and not pool.affinity
+
+
+def test_pool_reports_worker_errors(pool):
+    future = pool.submit(0, [(7, 7, engine.BLACK)], "no-such-level")
+    with pytest.raises(RuntimeError):
+        future.result(timeout=60)
@@ -0,0 +1,26 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 启动耗时测试：从进程创建起计时，导入耗时取自 -X importtime
+GitHub: RyanZzzzq
+"""
+
+import time
+
+import pytest
+
+from gobang_profile import process_elapsed, startup_times
+
+
+def test_process_elapsed_counts_from_process_start():
+    first = process_elapsed()
+    if first is None:
+        pytest.skip("没有 /proc")
+    time.sleep(0.05)
+    assert first > 0 and process_elapsed() >= first + 0.04
+
+
+def test_startup_times_lists_module_imports():
+    baseline, total, imports = startup_times("gobang_record", runs=1)
+    assert baseline > 0 and total > 0
+    names = [name for name, _ in imports]
+    assert "gobang_record" in names and "struct" in names
@@ -0,0 +1,73 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 已证明局面文件测试：多进程同时追加时的加锁与合并、搜索得到的记录写入后可完整读回
+GitHub: RyanZzzzq
+"""
+
+import multiprocessing
+import os
+
+import pytest
+
+import gobang_engine as engine
+from gobang_bench import TACTICAL_POSITIONS, tactical_board
+
+WRITERS = 4
+RECORDS_PER_WRITER = 200
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    engine.set_board_size(15)
+    engine.ensure_tables()
+    engine.clear_search_state()
+    yield
+    engine.clear_search_state()
+
+
+def append_records(path, writer):
+    # 每条记录单独追加，尽量让各进程的写入交错
+    for n in range(RECORDS_PER_WRITER):
+        key = (writer * RECORDS_PER_WRITER + n + 1) << 1 | n & 1
+        engine.proven_positions[key] = n % 100 + 1
+        engine.proven_pending.append(key)
+        engine.save_proven_positions(path)
+
+
+def test_concurrent_writers_merge(tmp_path):
+    path = str(tmp_path / "proven.bin")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=append_records, args=(path, w)) for w in range(WRITERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    total = WRITERS * RECORDS_PER_WRITER
+    # 文件头只写一次，记录完整不交错
+    assert os.path.getsize(path) == len(engine.PROVEN_MAGIC) + 1 + total * engine.PROVEN_RECORD.size
+    assert engine.load_proven_positions(path) == total
+    for writer in range(WRITERS):
+        for n in range(RECORDS_PER_WRITER):
+            key = (writer * RECORDS_PER_WRITER + n + 1) << 1 | n & 1
+            assert engine.proven_positions[key] == n % 100 + 1
+
+
+def test_search_proofs_round_trip(tmp_path):
+    path = str(tmp_path / "proven.bin")
+    _, blacks, whites, answers = TACTICAL_POSITIONS[-1]
+    move, score = engine.search_best_move(tactical_board(blacks, whites))
+    assert move in answers and score >= engine.WIN_THRESHOLD
+    proven = dict(engine.proven_positions)
+    assert proven and engine.save_proven_positions(path) == len(proven)
+    engine.proven_positions.clear()
+    assert engine.load_proven_positions(path) == len(proven)
+    assert engine.proven_positions == proven
+
+
+def test_rejects_file_for_other_board_size(tmp_path):
+    path = str(tmp_path / "proven.bin")
+    with open(path, "wb") as f:
+        f.write(engine.PROVEN_MAGIC + bytes([19]))
+    with pytest.raises(ValueError):
+        engine.load_proven_positions(path)
@@ -0,0 +1,58 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 棋谱测试：二进制格式与SGF的往返转换、SGF 解析对非法落子的检查
+GitHub: RyanZzzzq
+"""
+
+import pytest
+
+from gobang_record import RESULT_BLACK, RESULT_DRAW, GameRecord, from_sgf, iter_records, to_sgf, validate_moves, \
+    write_records
+
+RECORDS = [
+    GameRecord([(7, 7), (7, 8), (8, 8)], 15, RESULT_BLACK, "黑方", "白方", 300, 5),
+    GameRecord([], 15, RESULT_DRAW, "a\\", "b]c\\]"),
+    GameRecord([(0, 0), (19, 19), (10, 3)], 20, black="x" * 300),
+]
+
+
+def test_binary_round_trip(tmp_path):
+    path = str(tmp_path / "games.gbr")
+    assert write_records(path, RECORDS) == len(RECORDS)
+    loaded = list(iter_records(path))
+    # 超过255字节的名字按字符边界截断
+    assert loaded[:2] == RECORDS[:2]
+    assert loaded[2].moves == RECORDS[2].moves and loaded[2].black == "x" * 255
+
+
+@pytest.mark.parametrize("record", RECORDS[:2])
+def test_sgf_round_trip(record):
+    assert from_sgf(to_sgf(record)) == record
+
+
+def test_sgf_escapes_backslash_and_bracket():
+    text = to_sgf(GameRecord([], black="a\\", white="]"))
+    assert "PB[a\\\\]" in text and "PW[\\]]" in text
+    record = from_sgf(text)
+    assert (record.black, record.white) == ("a\\", "]")
+
+
+def test_from_sgf_reads_moves():
+    record = from_sgf("(;GM[4]FF[4]SZ[15];B[hh];W[ih])")
+    assert record.moves == [(7, 7), (7, 8)]
+
+
+@pytest.mark.parametrize("text", [
+    "(;GM[4]SZ[15];B[zz])",          # 棋盘外
+    "(;GM[4]SZ[9];B[aa];W[jj])",     # 超出 SZ 给出的大小
+    "(;GM[4]SZ[15];B[hh];W[hh])",    # 重复落子
+])
+def test_from_sgf_rejects_illegal_moves(text):
+    with pytest.raises(ValueError):
+        from_sgf(text)
+
+
+def test_validate_moves_against_board_size():
+    validate_moves([(0, 0), (14, 14)], 15)
+    with pytest.raises(ValueError):
+        validate_moves([(0, 0), (15, 0)], 15)
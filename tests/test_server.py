@@ -0,0 +1,83 @@
+"""
+-*- coding: utf-8 -*-
+Desc: 对战服务器测试：对局状态（五连判断、搜索深度、每步时间上限）与通过TCP的完整对局流程
+GitHub: RyanZzzzq
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import gobang_engine as engine
+import gobang_pool
+import gobang_server
+from gobang_server import Game, GameServer, SearchPool
+
+
+@pytest.fixture(autouse=True)
+def board_size():
+    engine.set_board_size(15)
+
+
+def test_game_win_and_undo():
+    game = Game(1, 15, 10.0)
+    for j in range(4):
+        game.play(7, j, engine.BLACK)
+        assert not game.is_win(7, j)
+    game.play(7, 4, engine.BLACK)
+    assert game.is_win(7, 4)
+    assert not game.is_legal(7, 4) and not game.is_legal(15, 0)
+    game.undo()
+    assert game.is_legal(7, 4) and len(game.stones) == 4
+
+
+def test_time_budget_controls_depth_and_move_time():
+    game = Game(1, 15, 10.0)
+    assert game.search_depth() == engine.MAX_DEPTH
+    assert game.move_time() == pytest.approx(10.0 * gobang_server.MOVE_TIME_FRACTION)
+    game.time_used = 8.0
+    assert game.search_depth() == max(1, engine.MAX_DEPTH - 1)
+    assert game.move_time() == pytest.approx(2.0 * gobang_server.MOVE_TIME_FRACTION)
+    game.time_used = 12.0
+    assert game.move_time() == 0.0
+    assert Game(1, 15, 10.0, level="easy").search_depth() == "easy"
+
+
+async def play_session(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def request(line):
+        writer.write((line + "\n").encode())
+        await writer.drain()
+        return (await reader.readline()).decode().split()
+
+    replies = [(await reader.readline()).decode().split()]
+    replies.append(await request("MOVE 7 7"))
+    replies.append(await request("MOVE 7 7"))
+    replies.append(await request("STATS"))
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+    return replies
+
+
+def test_server_plays_over_tcp(monkeypatch):
+    monkeypatch.setattr(gobang_pool, "OPENING_RADIUS", 0)
+
+    async def run():
+        pool = SearchPool(1, 4, 15)
+        try:
+            game_server = GameServer(pool, 15, 10.0)
+            server = await asyncio.start_server(game_server.handle_client, "127.0.0.1", 0)
+            async with server:
+                return await play_session(server.sockets[0].getsockname()[1])
+        finally:
+            pool.shutdown()
+
+    ready, move, illegal, stats = asyncio.run(run())
+    assert ready[0] == "READY" and ready[2] == "15"
+    assert move[0] == "MOVE" and (int(move[1]), int(move[2])) != (7, 7)
+    assert illegal[0] == "ERROR"
+    metrics = json.loads(" ".join(stats[1:]))
+    assert metrics["searches"] == 1 and metrics["games_active"] == 1